@@ -21,7 +21,7 @@ Change log:
 __VERSION__ = '0.0.2'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 ################################################################################
 ## Game Constants
@@ -39,22 +39,22 @@ GRID_HEIGHT = 30
 SQUARE_SIZE = 25
 
 # Make square images: Colors of the rainbow w/ some shades and mixes
-PINK_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.PINK)
-RED_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.RED)
-DARK_RED_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.DARK_RED)
-ORANGE_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.ORANGE)
-YELLOW_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.YELLOW)
-LIGHT_GREEN_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.LIGHT_GREEN)
-GREEN_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.GREEN)
-DARK_GREEN_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.DARK_GREEN)
-CYAN_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.CYAN)
-BLUE_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.BLUE)
-DARK_BLUE_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.DARK_BLUE)
-PURPLE_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.PURPLE)
-BROWN_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.BROWN)
-WHITE_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.WHITE)
-GRAY_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.GRAY)
-BLACK_SQUARE = arcade.make_soft_square_texture(SQUARE_SIZE, arcade.color.BLACK)
+PINK_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.PINK)
+RED_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.RED)
+DARK_RED_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.DARK_RED)
+ORANGE_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.ORANGE)
+YELLOW_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.YELLOW)
+LIGHT_GREEN_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.LIGHT_GREEN)
+GREEN_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.GREEN)
+DARK_GREEN_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.DARK_GREEN)
+CYAN_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.CYAN)
+BLUE_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.BLUE)
+DARK_BLUE_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.DARK_BLUE)
+PURPLE_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.PURPLE)
+BROWN_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.BROWN)
+WHITE_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.WHITE)
+GRAY_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.GRAY)
+BLACK_SQUARE = assets.make_soft_square_texture(SQUARE_SIZE, arcade.color.BLACK)
 
 # We can map the string versions of colors to the texture with a dictionary
 SQUARE_COLOR_TEXTURES = {
@@ -145,11 +145,18 @@ World = {
     'current mouse y': int
 }
 
-INITIAL_WORLD = {
-    'grid': make_grid_color(GRID_WIDTH, GRID_HEIGHT, 'white'),
-    'current mouse x': None,
-    'current mouse y': None
-}
+def make_initial_world() -> World:
+    """
+    Makes a new, entirely white grid to start coloring.
+    
+    Returns:
+        World: A new initial world.
+    """
+    return {
+        'grid': make_grid_color(GRID_WIDTH, GRID_HEIGHT, 'white'),
+        'current mouse x': None,
+        'current mouse y': None
+    }
 
 
 ################################################################################
@@ -379,7 +386,7 @@ def handle_release(world: World, key: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, make_initial_world,
                 draw_world, update_world, handle_key, handle_mouse,
                 handle_motion, handle_release)
     arcade.set_background_color(BACKGROUND_COLOR)
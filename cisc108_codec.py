@@ -0,0 +1,484 @@
+"""
+This file contains the tools for saving and loading worlds in a compact
+binary format (see WorldCodec). cisc108_game.py only imports it once a
+world is actually saved or loaded.
+
+You do not need to open or read this file. It must
+be in the same folder as your other files.
+
+Change Log:
+  - 0.0.2: The World type's hash no longer depends on the modules of its classes
+  - 0.0.1: Moved out of cisc108_game.py (version 0.0.32)
+"""
+
+__version__ = '0.0.2'
+
+import array, gc, hashlib, io, itertools, pickle, struct, sys
+
+from cisc108_types import Record, _split_dictionary_type
+
+WORLD_MAGIC = b'C108WLD\x01'
+
+# Lists of fixed-size values are read this many elements at a time
+READ_CHUNK = 4096
+
+def _read_exactly(source, size: int) -> bytes:
+    data = source.read(size)
+    if len(data) != size:
+        raise ValueError("The saved world ended too early")
+    return data
+
+class _Strings:
+    """
+    The table of strings (and pickled values) of an encoded world. Each
+    different string is only stored once, and is referred to by its index.
+    
+    Attributes:
+        entries (list): The kind (0 for a string, 1 for a pickled value) and
+            bytes of each entry.
+        indexes (dict): Maps each string to its index.
+        pickles (dict): Maps the bytes of each pickled value to its index.
+    """
+    def __init__(self):
+        self.entries = []
+        self.indexes = {}
+        self.pickles = {}
+    
+    def string(self, text: str) -> int:
+        index = self.indexes.get(text)
+        if index is None:
+            index = self.indexes[text] = len(self.entries)
+            self.entries.append((0, text.encode()))
+        return index
+    
+    def pickled(self, value) -> int:
+        blob = pickle.dumps(value)
+        index = self.pickles.get(blob)
+        if index is None:
+            index = self.pickles[blob] = len(self.entries)
+            self.entries.append((1, blob))
+        return index
+
+def _unpack_other(tag: int, number, table: list):
+    ''' Produces a value that was not packed as its expected type. '''
+    if tag == 0:
+        return None
+    elif tag == 2:
+        return table[int(number)]
+    # A bool standing in for an int, or an int standing in for a float
+    return bool(number) if type(number) is int else int(number)
+
+class _Fixed:
+    """
+    Part of a World type whose values always take the same number of bytes,
+    so that many of them can be packed (and unpacked) with a single Struct.
+    Every value is packed as a tag (0 for None, 1 for the expected type, 2
+    for a value pickled into the string table, and 3 for a bool or int
+    standing in for an int or float) and a number, followed by its fields.
+    
+    Like the compiled type checks, each part writes Python source code for
+    flattening a value into a list of numbers, and an expression for
+    building the value back from a row of numbers, so that each row only
+    needs a single function call.
+    """
+    def compile(self):
+        self.struct = struct.Struct('<' + self.format)
+        namespace = {'_unpack_other': _unpack_other}
+        lines = ["def flatten(v, flat, strings):"]
+        self.write_flatten("v", lines, 1, namespace)
+        # The same, but looping over a whole list within one call
+        lines.append("def flatten_all(values, flat, strings):")
+        lines.append("    for v in values:")
+        self.write_flatten("v", lines, 2, namespace)
+        expression = self.build_expression(0, namespace)
+        lines.append("def build(row, table):")
+        lines.append("    return " + expression)
+        lines.append("def build_all(rows, table):")
+        lines.append("    return [{} for row in rows]".format(expression))
+        exec(compile("\n".join(lines), "<codec>", "exec"), namespace)
+        self.flatten, self.build = namespace['flatten'], namespace['build']
+        self.flatten_all, self.build_all = namespace['flatten_all'], namespace['build_all']
+        return self
+    
+    def write(self, value, output: list, strings: _Strings):
+        flat = []
+        self.flatten(value, flat, strings)
+        output.append(self.struct.pack(*flat))
+    
+    def read(self, source, table: list):
+        return self.build(self.struct.unpack(_read_exactly(source, self.struct.size)), table)
+
+class _Leaf(_Fixed):
+    """ A value that is not a list or dictionary. """
+    # The number's format and range (if it is checked) for each type
+    NUMBERS = {float: ('d', None), int: ('i', 2**31), bool: ('i', None), str: ('i', None)}
+    
+    def __init__(self, expected_type):
+        self.expected_type = expected_type
+        self.number, self.limit = self.NUMBERS.get(expected_type, ('i', None))
+        self.format = 'B' + self.number
+        self.blank = (0, 0)
+        self.compile()
+    
+    def pack(self, value, strings: _Strings) -> tuple:
+        expected_type, kind = self.expected_type, type(value)
+        if value is None:
+            return (0, 0)
+        elif kind is expected_type and kind is str:
+            return (1, strings.string(value))
+        elif kind is expected_type and kind in (float, bool):
+            return (1, value)
+        elif kind is int and expected_type is int and -2**31 <= value < 2**31:
+            return (1, value)
+        elif kind is bool and expected_type is int:
+            return (3, value)
+        elif kind is int and expected_type is float and abs(value) <= 2**53:
+            return (3, value)
+        return (2, strings.pickled(value))
+    
+    def write_flatten(self, variable, lines, indent, namespace):
+        pad = "    " * indent
+        name = "leaf{}".format(len(namespace))
+        namespace[name] = self
+        if self.expected_type in self.NUMBERS:
+            check = "type({}) is {}".format(variable, self.expected_type.__name__)
+            if self.limit:
+                check += " and {} <= {} < {}".format(-self.limit, variable, self.limit)
+            value = ("strings.string({})" if self.expected_type is str else "{}").format(variable)
+            lines.append(pad+"if {}: flat += (1, {})".format(check, value))
+            lines.append(pad+"else: flat += {}.pack({}, strings)".format(name, variable))
+        else:
+            lines.append(pad+"flat += {}.pack({}, strings)".format(name, variable))
+    
+    def build_expression(self, offset, namespace):
+        tag, number = "row[{}]".format(offset), "row[{}]".format(offset+1)
+        other = "_unpack_other({}, {}, table)".format(tag, number)
+        if self.expected_type is str:
+            value = "table[{}]".format(number)
+        elif self.expected_type is bool:
+            value = "bool({})".format(number)
+        elif self.expected_type in (int, float):
+            value = number
+        else:
+            return other
+        return "({} if {} == 1 else {})".format(value, tag, other)
+
+class _FixedRecord(_Fixed):
+    """ A Record type (or Record class) whose fields are all fixed-size. """
+    def __init__(self, fields: list, record_class=None):
+        self.fields = fields
+        self.record_class = record_class
+        self.format = 'Bi' + ''.join(node.format for key, node in fields)
+        self.blank = (0, 0) + tuple(itertools.chain.from_iterable(node.blank for key, node in fields))
+        self.compile()
+    
+    def matches(self, value) -> bool:
+        if self.record_class is not None:
+            return isinstance(value, self.record_class)
+        return (isinstance(value, dict) and len(value) == len(self.fields) and
+                all(key in value for key, node in self.fields))
+    
+    def write_flatten(self, variable, lines, indent, namespace):
+        pad = "    " * indent
+        name = "record{}".format(len(namespace))
+        namespace[name] = self
+        if self.record_class is not None:
+            namespace[name+"class"] = self.record_class
+            lines.append(pad+"if isinstance({}, {}class):".format(variable, name))
+        else:
+            lines.append(pad+"if isinstance({}, dict) and len({}) == {} and {}:".format(
+                variable, variable, len(self.fields),
+                " and ".join("{!r} in {}".format(key, variable) for key, node in self.fields)))
+        lines.append(pad+"    flat += (1, 0)")
+        for key, node in self.fields:
+            child = "v{}".format(len(namespace))
+            namespace[child] = None
+            lines.append(pad+"    {} = {}[{!r}]".format(child, variable, key))
+            node.write_flatten(child, lines, indent+1, namespace)
+        lines.append(pad+"else:")
+        lines.append(pad+"    flat += (0, 0) if {0} is None else (2, strings.pickled({0}))".format(variable))
+        lines.append(pad+"    flat += {}.blank[2:]".format(name))
+    
+    def build_expression(self, offset, namespace):
+        parts, position = [], offset + 2
+        for key, node in self.fields:
+            parts.append((key, node.build_expression(position, namespace)))
+            position += len(node.blank)
+        if self.record_class is not None:
+            name = "record{}".format(len(namespace))
+            namespace[name] = self.record_class
+            value = "{}({})".format(name, ", ".join(part for key, part in parts))
+        else:
+            value = "{" + ", ".join("{!r}: {}".format(key, part) for key, part in parts) + "}"
+        return "({} if row[{}] == 1 else _unpack_other(row[{}], row[{}], table))".format(
+            value, offset, offset, offset+1)
+
+_HEADER = struct.Struct('<Bi')
+
+class _Variable:
+    """
+    Part of a World type whose values can take any number of bytes. Each
+    value starts with a header: a tag (like a _Fixed value's) and a number
+    (the length of a list, or the index of a pickled value).
+    """
+    def write_header(self, value, output: list, strings: _Strings, count: int = 0) -> bool:
+        if self.matches(value):
+            output.append(_HEADER.pack(1, count))
+            return True
+        output.append(_HEADER.pack(0, 0) if value is None else
+                      _HEADER.pack(2, strings.pickled(value)))
+        return False
+    
+    def read_header(self, source, table: list):
+        tag, number = _HEADER.unpack(_read_exactly(source, _HEADER.size))
+        if tag == 1:
+            return True, number
+        return False, _unpack_other(tag, number, table)
+
+class _Record(_Variable):
+    """ A Record type with at least one field that is a list or Lookup. """
+    matches = _FixedRecord.matches
+    
+    def __init__(self, fields: list, record_class=None):
+        self.fields = fields
+        self.record_class = record_class
+    
+    def write(self, value, output: list, strings: _Strings):
+        if self.write_header(value, output, strings):
+            for key, node in self.fields:
+                node.write(value[key], output, strings)
+    
+    def read(self, source, table: list):
+        present, value = self.read_header(source, table)
+        if not present:
+            return value
+        if self.record_class is not None:
+            return self.record_class(*[node.read(source, table) for key, node in self.fields])
+        return {key: node.read(source, table) for key, node in self.fields}
+
+class _List(_Variable):
+    """
+    A list type, written as its length and then its elements. Elements of a
+    fixed size are packed together, and read back in chunks. Lists of
+    numbers or strings that are all exactly the expected type are written
+    as a plain column of numbers instead (with the tag 4).
+    """
+    def __init__(self, element):
+        self.element = element
+    
+    def matches(self, value) -> bool:
+        return isinstance(value, list)
+    
+    def write(self, value, output: list, strings: _Strings):
+        element = self.element
+        if isinstance(element, _Leaf) and self.write_column(value, output, strings):
+            return
+        if not self.write_header(value, output, strings,
+                                 len(value) if self.matches(value) else 0):
+            return
+        if isinstance(element, _Fixed):
+            flat = []
+            element.flatten_all(value, flat, strings)
+            output.append(struct.pack('<' + element.format*len(value), *flat))
+        else:
+            for child in value:
+                element.write(child, output, strings)
+    
+    def write_column(self, value, output: list, strings: _Strings) -> bool:
+        '''
+        Writes a list whose elements are all exactly the expected type as
+        a column of numbers, without any tags. Produces whether it could.
+        '''
+        element = self.element
+        if not isinstance(value, list):
+            return False
+        if element.expected_type is str:
+            try:
+                # Quickest when every string is already in the table
+                numbers = list(map(strings.indexes.__getitem__, value))
+            except (KeyError, TypeError):
+                if set(map(type, value)) - {str}:
+                    return False
+                numbers = list(map(strings.string, value))
+        elif element.expected_type not in (int, float, bool):
+            return False
+        elif set(map(type, value)) - {element.expected_type}:
+            return False
+        elif element.limit and value and not -element.limit <= min(value) <= max(value) < element.limit:
+            return False
+        else:
+            numbers = value
+        column = array.array(element.number, numbers)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        output.append(_HEADER.pack(4, len(value)))
+        output.append(column.tobytes())
+        return True
+    
+    def read_column(self, source, length: int, table: list) -> list:
+        element = self.element
+        column = array.array(element.number)
+        column.frombytes(_read_exactly(source, length * column.itemsize))
+        if sys.byteorder == 'big':
+            column.byteswap()
+        if element.expected_type is str:
+            return [table[index] for index in column]
+        elif element.expected_type is bool:
+            return list(map(bool, column))
+        return column.tolist()
+    
+    def read(self, source, table: list):
+        tag, length = _HEADER.unpack(_read_exactly(source, _HEADER.size))
+        if tag == 4:
+            return self.read_column(source, length, table)
+        elif tag != 1:
+            return _unpack_other(tag, length, table)
+        element = self.element
+        if not isinstance(element, _Fixed):
+            return [element.read(source, table) for index in range(length)]
+        values, layout = [], element.struct
+        while len(values) < length:
+            count = min(READ_CHUNK, length - len(values))
+            data = _read_exactly(source, count * layout.size)
+            values += element.build_all(layout.iter_unpack(data), table)
+        return values
+
+class _Lookup(_Variable):
+    """
+    A dictionary type with a Lookup key type, written as its fields (if it
+    has any) and then the number of other keys, followed by each key and
+    its value.
+    """
+    def __init__(self, fields: list, key, value):
+        self.fields = fields
+        self.key = key
+        self.value = value
+        self.names = {name for name, node in fields}
+    
+    def matches(self, value) -> bool:
+        return isinstance(value, dict) and all(name in value for name in self.names)
+    
+    def write(self, value, output: list, strings: _Strings):
+        others = [(key, child) for key, child in value.items() if key not in self.names] if self.matches(value) else []
+        if not self.write_header(value, output, strings, len(others)):
+            return
+        for name, node in self.fields:
+            node.write(value[name], output, strings)
+        for key, child in others:
+            self.key.write(key, output, strings)
+            self.value.write(child, output, strings)
+    
+    def read(self, source, table: list):
+        present, length = self.read_header(source, table)
+        if not present:
+            return length
+        value = {name: node.read(source, table) for name, node in self.fields}
+        for index in range(length):
+            key = self.key.read(source, table)
+            value[key] = self.value.read(source, table)
+        return value
+
+def _make_codec_part(expected_type):
+    """ Produces the part of a WorldCodec that encodes the expected_type. """
+    record_class = None
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        record_class, expected_type = expected_type, expected_type._schema
+    if isinstance(expected_type, dict):
+        fields, lookup = _split_dictionary_type(expected_type)
+        fields = [(key, _make_codec_part(value)) for key, value in fields.items()]
+        if lookup is not None:
+            return _Lookup(fields, _make_codec_part(lookup[0]), _make_codec_part(lookup[1]))
+        if all(isinstance(node, _Fixed) for key, node in fields):
+            return _FixedRecord(fields, record_class)
+        return _Record(fields, record_class)
+    elif isinstance(expected_type, list):
+        return _List(_make_codec_part(expected_type[0] if expected_type else None))
+    return _Leaf(expected_type)
+
+def _type_key(expected_type):
+    '''
+    Produces a version of the type that only depends on its structure, not
+    on the modules its classes came from: a Record class made while its
+    game runs as "__main__" has the same key as when the game is imported.
+    '''
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        return ('record', expected_type.__name__, _type_key(expected_type._schema))
+    elif isinstance(expected_type, dict):
+        return ('dict', tuple((_type_key(key), _type_key(value))
+                              for key, value in expected_type.items()))
+    elif isinstance(expected_type, list):
+        return ('list', tuple(map(_type_key, expected_type)))
+    elif isinstance(expected_type, type):
+        return expected_type.__qualname__
+    return expected_type
+
+class WorldCodec:
+    """
+    Saves and loads worlds of the given World type in a compact binary
+    format. The file starts with WORLD_MAGIC, a hash of the World type, and
+    a table of every different string in the world (along with any values
+    that do not fit the World type, pickled). Then the world follows, in
+    the order of the World type: numbers are packed with struct, lists
+    start with their length, and strings refer to the table. Loading reads
+    the file as it goes, building the world directly.
+    
+    Args:
+        World (dict): The type of the worlds to save and load.
+    """
+    def __init__(self, World):
+        self.World = World
+        self.root = _make_codec_part(World)
+        self.type_hash = hashlib.blake2b(repr(_type_key(World)).encode(),
+                                         digest_size=8).digest()
+    
+    def dump(self, world, output):
+        """ Writes the world into the (binary) file. """
+        strings, parts = _Strings(), []
+        self.root.write(world, parts, strings)
+        output.write(WORLD_MAGIC + self.type_hash)
+        output.write(struct.pack('<I', len(strings.entries)))
+        for kind, blob in strings.entries:
+            output.write(struct.pack('<BI', kind, len(blob)))
+            output.write(blob)
+        output.writelines(parts)
+    
+    def load(self, source):
+        """ Reads a world from the (binary) file. """
+        header = _read_exactly(source, len(WORLD_MAGIC) + 8)
+        if not header.startswith(WORLD_MAGIC):
+            raise ValueError("That is not a saved world")
+        if header[len(WORLD_MAGIC):] != self.type_hash:
+            raise ValueError("That world was saved with a different World type")
+        count, = struct.unpack('<I', _read_exactly(source, 4))
+        table = []
+        for index in range(count):
+            kind, size = struct.unpack('<BI', _read_exactly(source, 5))
+            blob = _read_exactly(source, size)
+            table.append(blob.decode() if kind == 0 else pickle.loads(blob))
+        # Making this many containers at once would otherwise set off
+        # collections that cannot find anything to free
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return self.root.read(source, table)
+        finally:
+            if collecting:
+                gc.enable()
+    
+    def dumps(self, world) -> bytes:
+        output = io.BytesIO()
+        self.dump(world, output)
+        return output.getvalue()
+    
+    def loads(self, data: bytes):
+        return self.load(io.BytesIO(data))
+
+def save_world(world, World, path: str):
+    """ Saves the world (of the given World type) into the file at `path`. """
+    with open(path, 'wb') as output:
+        WorldCodec(World).dump(world, output)
+
+def load_world(World, path: str):
+    """ Loads a world (of the given World type) saved by save_world. """
+    with open(path, 'rb') as source:
+        return WorldCodec(World).load(source)
@@ -0,0 +1,94 @@
+from cisc108 import assert_equal
+from cisc108_codec import *
+from cisc108_types import make_record_class
+
+__VERSION__ = '0.0.1'
+
+def round_trip(world, World):
+    ''' Saves and loads the world, producing the loaded world. '''
+    codec = WorldCodec(World)
+    return codec.loads(codec.dumps(world))
+
+def same_types(first, second) -> bool:
+    ''' Whether the two values are equal, with exactly the same types inside. '''
+    if type(first) is not type(second):
+        return False
+    if isinstance(first, dict):
+        return (list(first) == list(second) and
+                all(same_types(first[key], second[key]) for key in first))
+    if isinstance(first, list):
+        return (len(first) == len(second) and
+                all(same_types(*pair) for pair in zip(first, second)))
+    return first == second
+
+################################################################################
+## Testing int, bool and float leaves
+Numbers = {'count': int, 'alive': bool, 'speed': float, 'name': str}
+for world in [{'count': 3, 'alive': True, 'speed': 1.5, 'name': 'ada'},
+              {'count': -2**31, 'alive': False, 'speed': -0.0, 'name': ''},
+              # Values standing in for other types keep their own types
+              {'count': True, 'alive': 1, 'speed': 2, 'name': 'ada'},
+              {'count': 2**40, 'alive': None, 'speed': 2**60, 'name': None}]:
+    assert_equal(same_types(round_trip(world, Numbers), world), True)
+# Lists of leaves, with and without values of other types
+Columns = {'ints': [int], 'floats': [float], 'flags': [bool], 'names': [str]}
+world = {'ints': [1, 2, 3], 'floats': [0.5, 1.5], 'flags': [True, False], 'names': ['a', 'b', 'a']}
+assert_equal(same_types(round_trip(world, Columns), world), True)
+world = {'ints': [1, True, 2**40], 'floats': [1, 0.5], 'flags': [1], 'names': ['a', 5]}
+assert_equal(same_types(round_trip(world, Columns), world), True)
+
+################################################################################
+## Testing Lookups
+Scores = {'title': str, str: [int]}
+world = {'title': 'scores', 'ada': [1, 2], 'grace': []}
+assert_equal(same_types(round_trip(world, Scores), world), True)
+Grid = {int: {int: str}}
+world = {0: {0: 'red', 1: 'blue'}, 5: {}}
+assert_equal(same_types(round_trip(world, Grid), world), True)
+
+################################################################################
+## Testing Record classes
+Position = make_record_class('Position', {'x': int, 'y': float})
+Dot = make_record_class('Dot', {'current': Position, 'trail': [Position]})
+World = {'dots': [Dot], 'best': Position}
+world = {'dots': [Dot(Position(1, 2.5), [Position(0, 0.0)]), Dot(Position(3, 4.0), [])],
+         'best': Position(5, 6.0)}
+loaded = round_trip(world, World)
+assert_equal(loaded, world)
+assert_equal(type(loaded['dots'][0]) is Dot, True)
+assert_equal(type(loaded['dots'][0].current) is Position, True)
+
+################################################################################
+## Testing values that do not fit the World type
+Position = {'x': int, 'y': int}
+World = {'dots': [Position], 'score': int}
+for world in [{'dots': [{'x': 1}], 'score': 0},
+              {'dots': [{'x': 1, 'y': 2, 'z': 3}], 'score': 'lots'},
+              {'dots': None, 'score': [1, 2]},
+              {'dots': [None, {'x': 'one', 'y': 2}], 'score': 0},
+              {'dots': {'x': 1, 'y': 2}, 'score': 0.5}]:
+    assert_equal(same_types(round_trip(world, World), world), True)
+
+################################################################################
+## Testing the header
+codec = WorldCodec(World)
+data = codec.dumps({'dots': [], 'score': 0})
+assert_equal(data.startswith(WORLD_MAGIC), True)
+try:
+    WorldCodec({'dots': [Position]}).loads(data)
+    assert_equal("a different World type was noticed", True)
+except ValueError:
+    pass
+# Record classes from another module (like a game run as "__main__", and
+# then imported) still fit, as long as they have the same names and schemas
+Position = make_record_class('Position', {'x': int, 'y': int})
+MainPosition = make_record_class('Position', {'x': int, 'y': int})
+MainPosition.__module__ = 'game3_red_dot'
+data = WorldCodec({'best': MainPosition}).dumps({'best': MainPosition(1, 2)})
+assert_equal(WorldCodec({'best': Position}).loads(data), {'best': Position(1, 2)})
+OtherPosition = make_record_class('Position', {'x': int, 'z': int})
+try:
+    WorldCodec({'best': OtherPosition}).loads(data)
+    assert_equal("a different Record schema was noticed", True)
+except ValueError:
+    pass
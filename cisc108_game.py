@@ -1,258 +1,2441 @@
 """
-This file contains a basic Arcade Window class. It is necessary
-to run your game.
+This file contains a basic game class built around a World. It is
+necessary to run your game. Arcade is only imported once a window is made.
 
-You do not need to open or read this file. It must
-be in the same folder as your other files.
+You do not need to open or read this file. It must be in the same folder
+as your other files, along with cisc108_types.py, cisc108_window.py and
+cisc108_codec.py.
 
 Change Log:
+  - 0.0.41: inspect, cProfile and tracemalloc are imported only by the features using them
+  - 0.0.40: ast is imported only when a patch is applied
+  - 0.0.39: The peak memory of a call includes the peaks of the calls inside it
+  - 0.0.38: Replaying the events before a failed check no longer acts on the real game
+  - 0.0.37: concurrent.futures is imported only when workers are started
+  - 0.0.36: A coroutine update_world runs one task at a time; asyncio is imported only when needed
+  - 0.0.35: Reloading keeps the Record classes of the world, if they did not change
+  - 0.0.34: diff_worlds notices when only the type of a value in a list changed
+  - 0.0.33: Moved saving and loading worlds to cisc108_codec.py
+  - 0.0.32: Snapshots of tracked worlds that did not change cost nothing
+  - 0.0.31: Typed games that skip unchanged draws track their world's changes,
+            instead of describing the whole world every frame
+  - 0.0.30: Frame checks happen after updating, so they run even when
+            frames are not drawn
+  - 0.0.29: Slow work can be run on other threads (or processes), with the
+            results given to the world at the start of the next frame
+  - 0.0.28: Functions can be coroutines, run on an asyncio loop between frames
+  - 0.0.27: The game's file can be reloaded while it runs, keeping the world
+  - 0.0.26: Added a flight recorder, which saves the latest input (and how
+            the world changed) to a file when the game fails
+  - 0.0.25: Added a timeline of every frame and function, for trace viewers
+  - 0.0.24: Added diff_worlds and apply_patch, for small patches between worlds
+  - 0.0.23: Worlds can be saved and loaded in a compact binary format
+  - 0.0.22: Records (see make_record_class) can be snapshotted and hashed
+  - 0.0.21: The longest garbage collections can be scheduled between frames
+  - 0.0.20: Added tracking of memory allocations and garbage collection
+  - 0.0.19: The initial world can be given as a function that makes it
+  - 0.0.18: Added an asset registry, so textures load when first drawn
+  - 0.0.17: Moved type checks to cisc108_types.py and the window (and
+            everything else that needs arcade) to cisc108_window.py
+  - 0.0.16: Added a hotkey to profile the next few frames
+  - 0.0.15: Added snapshots of the world, for rewinding and undoing
+  - 0.0.14: Added recording of input, and replaying it headless at full speed
+  - 0.0.13: Added batching of arcade's immediate drawing functions
+  - 0.0.12: Unchanged worlds can skip drawing and show the last frame again
+  - 0.0.11: Mouse movements can be coalesced into one handle_motion per frame
+  - 0.0.10: Added timings of every function, written out as JSON or CSV
+  - 0.0.9: Added fixed simulation steps, with interpolation when drawing
+  - 0.0.8: The window is now separate from the game, so games can run headless
+  - 0.0.7: Added validation policies and replay on failure
+  - 0.0.6: Added incremental World checks
+  - 0.0.5: World types are compiled into validators once, up front
   - 0.0.4: Added on_key_release
   - 0.0.3: Allow int in World checks for float type
   - 0.0.2: Added assert_type, World checks, mock game runner
   - 0.0.1: Initial version
 """
 
-__version__ = '0.0.4'
+__version__ = '0.0.41'
 
-import arcade
+import collections, copy, csv, functools, gc, hashlib, itertools, json, operator, os, pickle, random, re, struct, sys, threading, time, traceback, types
 
-# Better tools for detecting issues in students' code
-from cisc108.assertions import (get_line_code, QUIET,
-                                MESSAGE_LINE_CODE, MESSAGE_GENERIC_SUCCESS)
+# Checking types does not need arcade, so it lives in its own file
+from cisc108_types import (assert_type, get_name, make_record_class,
+                           make_type_validator, Record, WorldChanges,
+                           _schema_key, _split_dictionary_type, _validate_type)
 
 GAME_SPEED = 1/60
 
-class Cisc108GameUntyped(arcade.Window):
+# What replaying the events since the last check turns off, besides the
+# hotkeys, instruments and deliveries
+REPLAY_TURNS_OFF = ('recorder', 'flight', 'history', 'reloader', 'profiler',
+                    'garbage')
+
+# The game's functions, which are swapped for new ones when reloading
+GAME_FUNCTIONS = ('draw_world', 'update_world', 'handle_key', 'handle_release',
+                  'handle_mouse', 'handle_motion')
+
+# The same as arcade.MOUSE_BUTTON_LEFT, _RIGHT, and _MIDDLE
+MOUSE_BUTTON_NAMES = {1: 'left', 4: 'right', 2: 'middle'}
+
+def __getattr__(name):
+    """ Only imports arcade (through cisc108_window) when it is needed. """
+    if name in ('Cisc108Window', 'DrawBatcher'):
+        import cisc108_window
+        return getattr(cisc108_window, name)
+    if name in ('WORLD_MAGIC', 'WorldCodec', 'save_world', 'load_world'):
+        import cisc108_codec
+        return getattr(cisc108_codec, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+class LazyTexture:
+    """
+    Stands in for an arcade texture, but only loads (or makes) the texture
+    the first time it is used, usually when it is first drawn. Anything else
+    asked of the handle is passed along to the real texture.
+    
+    Attributes:
+        maker (str): The name of the arcade function that makes the texture.
+        args (tuple): The arguments to give to that function.
+        kwargs (dict): The keyword arguments to give to that function.
+        texture (arcade.Texture): The real texture, once it has been made.
+    """
+    __slots__ = ('maker', 'args', 'kwargs', 'texture')
+    
+    def __init__(self, maker: str, *args, **kwargs):
+        self.maker = maker
+        self.args = args
+        self.kwargs = kwargs
+        self.texture = None
+    
+    def load(self):
+        """ Makes the real texture, if that has not happened yet. """
+        if self.texture is None:
+            import arcade
+            self.texture = getattr(arcade, self.maker)(*self.args, **self.kwargs)
+        return self.texture
+    
+    def __getattr__(self, name):
+        if name.startswith('__') or name in LazyTexture.__slots__:
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+    
+    def key(self):
+        return (self.maker, self.args, tuple(sorted(self.kwargs.items())))
+    
+    def __eq__(self, other):
+        if not isinstance(other, LazyTexture):
+            return NotImplemented
+        return self.key() == other.key()
+    
+    def __hash__(self):
+        return hash(self.key())
+    
+    def __reduce__(self):
+        # Copies (and pickled worlds) come back as the registry's handle
+        return (_find_lazy_texture, (self.maker, self.args, self.kwargs))
+    
+    def __deepcopy__(self, memo):
+        return self
+    
+    def __repr__(self):
+        arguments = [repr(self.maker)] + [repr(arg) for arg in self.args]
+        arguments += ["{}={!r}".format(*item) for item in self.kwargs.items()]
+        return "LazyTexture({})".format(", ".join(arguments))
+
+def _find_lazy_texture(maker, args, kwargs):
+    return assets.texture(maker, *args, **kwargs)
+
+def resolve_texture(texture):
+    """ Gives back the real texture behind a LazyTexture (or the texture). """
+    if isinstance(texture, LazyTexture):
+        return texture.load()
+    return texture
+
+class AssetRegistry:
+    """
+    Hands out LazyTextures, so that importing a game does not load (or need
+    a window for) any of its images. Each function has the same arguments as
+    the arcade function with the same name.
+    
+    Attributes:
+        textures (dict): Every handle handed out so far, by its key.
+    """
+    def __init__(self):
+        self.textures = {}
+    
+    def texture(self, maker: str, *args, **kwargs) -> LazyTexture:
+        """
+        Makes a handle for the texture made by calling the given arcade
+        function with the given arguments. Asking for the same texture
+        twice gives back the same handle.
+        
+        Args:
+            maker (str): The name of an arcade function, like 'load_texture'.
+        Returns:
+            LazyTexture: The handle, which is loaded when first drawn.
+        """
+        handle = LazyTexture(maker, *args, **kwargs)
+        return self.textures.setdefault(handle.key(), handle)
+    
+    def load_texture(self, *args, **kwargs) -> LazyTexture:
+        return self.texture('load_texture', *args, **kwargs)
+    
+    def make_soft_square_texture(self, *args, **kwargs) -> LazyTexture:
+        return self.texture('make_soft_square_texture', *args, **kwargs)
+    
+    def make_soft_circle_texture(self, *args, **kwargs) -> LazyTexture:
+        return self.texture('make_soft_circle_texture', *args, **kwargs)
+    
+    def make_circle_texture(self, *args, **kwargs) -> LazyTexture:
+        return self.texture('make_circle_texture', *args, **kwargs)
+    
+    def preload(self):
+        """ Loads every texture now, instead of when each is first drawn. """
+        for handle in self.textures.values():
+            handle.load()
+
+# Games make their textures through this, e.g. assets.load_texture('ada.png')
+assets = AssetRegistry()
+
+def make_world(an_initial_world):
     """
-    An Arcade Window subclass that allows you to specify its
-    functions and is built around a World data model.
+    Produces the initial world. Games can give a function that makes it
+    instead of the world itself, so that importing the game (or its tests)
+    does not build a world, and every call gets a fresh one.
+    
+    Args:
+        an_initial_world (World or ->World): The world, or a function
+            (with no arguments) that makes it.
+    Returns:
+        World: The initial world.
+    """
+    if callable(an_initial_world):
+        return an_initial_world()
+    return an_initial_world
+
+class Cisc108GameUntyped:
+    """
+    A game that allows you to specify its functions and is built around a
+    World data model. Unless it is headless, the game is shown in an Arcade
+    Window, which passes all of its events to the game.
     
     Args:
         window_width (int): The width of the game window.
         window_height (int): The height of the game window.
         window_caption (str): The title of the game window.
-        an_initial_world (World): The initial state of the world.
+        an_initial_world (World): The initial state of the world, or a
+            function (with no arguments) that makes it when the game starts.
         draw_world (World->None): A function that draws a world.
         update_world (World->None): A function that updates the world.
         handle_key (World,int->None): A function that handles keyboard input.
         handle_mouse (World,int,int,str->None): A function that handles mouse clicks.
         handle_motion (World,int,int->None): A function that handles mouse movement.
+        headless (bool): Whether to skip making a window; the game can then
+            be driven by a HeadlessRunner instead.
+        update_rate (float): The seconds between frames of the window.
+        simulation_step (float): If given, the world is updated once for
+            every `simulation_step` seconds that pass, no matter how often
+            frames are drawn. Otherwise, it is updated once per frame.
+        max_catch_up (int): The most updates to run in a single frame when
+            the simulation has fallen behind; any more time is dropped.
+        interpolate (bool): Whether to also give draw_world how far (from
+            0 to 1) the simulation is between its last update and the next.
+        coalesce_motion (str): If 'latest', mouse movements are saved up and
+            handle_motion is called once per frame (just before updating)
+            with only the latest position. If 'all', handle_motion is instead
+            called once per frame with the world and a list of all the
+            positions ({'x': int, 'y': int}) the mouse moved through.
+        skip_unchanged_draws (bool): Whether to skip draw_world when the
+            world has not changed since it was last drawn; the window shows
+            a saved copy of the last frame instead. Typed games (Cisc108Game)
+            track the changes to their world for this, which is cheap; other
+            games compare a description of the whole world every frame.
+            Changes inside values other than dictionaries, lists and records
+            (like objects of the game's own classes) are not noticed.
+        batch_draws (bool): Whether to batch up the arcade drawing done by
+            draw_world (see DrawBatcher).
+        schedule_garbage (bool): Whether to keep the garbage collector's
+            longest pauses between frames instead of in them (see
+            GarbageScheduler).
     
     Attributes:
         world (World): The current state of the world.
+        window (arcade.Window): The window showing the game, or None.
+        time_behind (float): The seconds not yet simulated.
+        motions (list): The mouse positions saved up for this frame.
+        recorder (InputRecorder): Records the game's input, if started.
+        profiler (FrameProfiler): Profiles a few frames, when asked to.
+        history (deque): Snapshots of the world after each of the latest
+            frames, if rewinding was enabled.
+        instruments (list): The tools (like CallbackTimings) that are told
+            whenever one of the game's functions starts and stops, and
+            whenever a frame starts.
+        hotkeys (dict): Maps keys to functions run when that key is pressed,
+            instead of passing the key along to handle_key.
+        closing (list): Functions to run when the window is closed.
+        garbage (GarbageScheduler): Decides when to collect garbage, or None.
+        flight (FlightRecorder): Keeps the latest input, to save it when
+            the game fails, if enabled.
+        reloader (HotReloader): Watches the game's file, if enabled.
+        bridge (AsyncBridge): Runs the game's coroutines, if enabled.
+        workers (concurrent.futures.Executor): Runs submitted work, if any.
+        deliveries (deque): The (on_done, future) pairs of finished work,
+            waiting to be given to the world at the start of the next frame.
+            Other threads may add to it, which deques allow.
     """
     def __init__(self, window_width, window_height, window_caption,
                  an_initial_world, draw_world, update_world,
                  handle_key=None, handle_mouse=None, handle_motion=None,
-                 handle_release=None):
-        super().__init__(window_width, window_height, window_caption, update_rate=GAME_SPEED)
-        self.world = an_initial_world
+                 handle_release=None, headless=False, update_rate=GAME_SPEED,
+                 simulation_step=None, max_catch_up=5, interpolate=False,
+                 coalesce_motion=None, skip_unchanged_draws=False,
+                 batch_draws=False, schedule_garbage=False):
+        self.world = make_world(an_initial_world)
         self.draw_world = draw_world
         self.update_world = update_world
         self.handle_key = handle_key
         self.handle_release = handle_release
         self.handle_mouse = handle_mouse
         self.handle_motion = handle_motion
+        self.simulation_step = simulation_step
+        self.max_catch_up = max_catch_up
+        self.interpolate = interpolate
+        self.time_behind = 0.0
+        self.coalesce_motion = coalesce_motion
+        self.motions = []
+        self.skip_unchanged_draws = skip_unchanged_draws
+        self.drawn_fingerprint = None
+        self.drawn_frame = None
+        self.recorder = None
+        self.profiler = None
+        self.history = None
+        self.instruments = []
+        self.hotkeys = {}
+        self.closing = []
+        self.window = None
+        self.batcher = None
+        self.garbage = None
+        self.flight = None
+        self.reloader = None
+        self.bridge = None
+        self.workers = None
+        self.deliveries = collections.deque()
+        if schedule_garbage:
+            self.garbage = GarbageScheduler(update_rate)
+            self.closing.append(self.garbage.stop)
+        if not headless:
+            from cisc108_window import Cisc108Window, DrawBatcher
+            self.window = Cisc108Window(self, window_width, window_height,
+                                        window_caption, update_rate)
+            if batch_draws:
+                self.batcher = DrawBatcher()
+    
+    def run_callback(self, name: str, callback, *args):
+        """
+        Calls the callback with the given arguments, letting every instrument
+        know when the call (named `name`) starts and stops. If the callback
+        fails, the flight recorder (if any) saves what led up to it.
+        """
+        if not self.instruments and self.flight is None:
+            return callback(*args)
+        started = [instrument.start(name) for instrument in self.instruments]
+        try:
+            return callback(*args)
+        except Exception:
+            if self.flight is not None:
+                self.flight.dump(traceback.format_exc())
+            raise
+        finally:
+            for instrument, token in zip(reversed(self.instruments), reversed(started)):
+                instrument.stop(name, token)
+    
+    def enable_timings(self, path: str = "timings.json", key: int = None,
+                       samples: int = 1000):
+        """
+        Starts timing every call to the game's functions (and every world
+        check). The timings are written to the `path` (as CSV if it ends in
+        ".csv", or else as JSON) when the window closes, or when `key` is
+        pressed.
+        
+        Args:
+            path (str): The file to write the timings to.
+            key (int): The key that writes the timings, if any.
+            samples (int): How many of the latest calls to keep per function.
+        Returns:
+            CallbackTimings: The timings, which can also be written directly.
+        """
+        timings = CallbackTimings(samples)
+        self.instruments.append(timings)
+        write = lambda: timings.write(path)
+        if key is not None:
+            self.hotkeys[key] = write
+        self.closing.append(write)
+        return timings
+    
+    def enable_allocation_tracking(self, path: str = "allocations.json",
+                                   key: int = None, every: int = 60):
+        """
+        Starts tracking the memory allocated by every call to the game's
+        functions, and the pauses of the garbage collector (see
+        AllocationTracker). The report is written to the `path` as JSON
+        when the window closes, or when `key` is pressed. Tracking memory
+        slows everything down, so only the sizes should be trusted, not
+        the timings made at the same time.
+        
+        Args:
+            path (str): The file to write the report to.
+            key (int): The key that writes the report, if any.
+            every (int): How many frames to wait between finding the source
+                lines that allocate the most.
+        Returns:
+            AllocationTracker: The tracker, which can also be written directly.
+        """
+        tracker = AllocationTracker(every)
+        self.instruments.append(tracker)
+        write = lambda: tracker.write(path)
+        if key is not None:
+            self.hotkeys[key] = write
+        self.closing.append(write)
+        self.closing.append(tracker.stop_tracking)
+        return tracker
+    
+    def enable_tracing(self, path: str = None, key: int = None,
+                       events: int = 200000):
+        """
+        Starts recording a timeline of every frame, every call to the game's
+        functions, every garbage collection and every trace() block (see
+        Tracer). The timeline is written to the `path` when the window
+        closes, or when `key` is pressed, and can be opened in
+        chrome://tracing or https://ui.perfetto.dev.
+        
+        Args:
+            path (str): The file to write the timeline to; if None, it is
+                named after the game, like "game3_white_boo.trace.json".
+            key (int): The key that writes the timeline, if any.
+            events (int): How many of the latest events to keep.
+        Returns:
+            Tracer: The tracer, which can also be written directly.
+        """
+        label = game_name(self.update_world)
+        if path is None:
+            path = label + ".trace.json"
+        tracer = Tracer(label, events)
+        self.instruments.append(tracer)
+        write = lambda: tracer.write(path)
+        if key is not None:
+            self.hotkeys[key] = write
+        self.closing.append(write)
+        self.closing.append(tracer.stop_tracing)
+        return tracer
+    
+    def enable_flight_recorder(self, frames: int = 600, every: int = 60,
+                               directory: str = "."):
+        """
+        Starts keeping the input of the latest frames, along with a snapshot
+        of the world every few frames (see FlightRecorder). If one of the
+        game's functions raises an exception, or the world fails its check,
+        they are saved into a ".flight" file named after the game and the
+        time, which replay_flight can replay to reproduce the failure.
+        
+        Args:
+            frames (int): How many of the latest frames to keep, at least.
+            every (int): How many frames to wait between snapshots.
+            directory (str): Where to write the files.
+        Returns:
+            FlightRecorder: The recorder, which can also be saved directly.
+        """
+        self.flight = FlightRecorder(game_name(self.update_world),
+                                     getattr(self, 'World', None), frames,
+                                     every, directory)
+        self.flight.keyframe(self)
+        return self.flight
+    
+    def enable_hot_reload(self, path: str = None, interval: float = 0.5,
+                          key: int = None):
+        """
+        Starts watching the game's file (the one update_world is from,
+        unless another `path` is given). Whenever the file is saved, it is
+        run again and the game's functions are swapped for the new ones (see
+        reload), while the world, the window and its textures stay as they
+        are. Meant for while the game is being written.
+        
+        Args:
+            path (str): The file to watch.
+            interval (float): The seconds between looks at the file.
+            key (int): A key that reloads the file right away, if any.
+        Returns:
+            HotReloader: The watcher of the file.
+        """
+        if path is None:
+            path = sys.modules[self.update_world.__module__].__file__
+        self.reloader = HotReloader(path, game_name(self.update_world), interval)
+        if key is not None:
+            self.hotkeys[key] = self.reload
+        return self.reloader
+    
+    def reload(self) -> bool:
+        """
+        Runs the watched file again, and swaps in its new functions. If the
+        file fails to run, the problem is printed and the game keeps going
+        with its old functions.
+        
+        Returns:
+            bool: Whether the new functions were swapped in.
+        """
+        try:
+            module = self.reloader.load()
+        except Exception:
+            print("Could not reload {}:\n{}".format(self.reloader.path,
+                                                   traceback.format_exc()))
+            return False
+        if not self.swap_functions(module):
+            return False
+        print("Reloaded {}".format(self.reloader.path))
+        return True
+    
+    def swap_functions(self, module) -> bool:
+        """
+        Replaces each of the game's functions with the one of the same name
+        in the module, if there is one.
+        
+        Returns:
+            bool: Whether the functions were swapped.
+        """
+        for attribute in GAME_FUNCTIONS:
+            function = getattr(self, attribute)
+            replacement = getattr(module, getattr(function, '__name__', ''), None)
+            if function is not None and callable(replacement):
+                setattr(self, attribute, replacement)
+        if self.bridge is not None:
+            self.wrap_coroutines()
+        # The new draw_world might draw the same world differently
+        self.drawn_fingerprint = None
+        return True
+    
+    def enable_async(self):
+        """
+        Starts an asyncio event loop that is run for a moment at the start of
+        every frame (see AsyncBridge), so that the game's functions can wait
+        on slow things (like files or other programs) without stopping the
+        frames. Any of update_world and the handle_* functions that are
+        coroutines (`async def`) are started as tasks on the loop instead of
+        being called; the world they were given can be changed after every
+        `await`, always on the game's own thread. A new update_world task is
+        only started once the last one has finished, so a slow update_world
+        skips frames instead of piling up tasks.
+        
+        Returns:
+            AsyncBridge: The bridge, which has the loop.
+        """
+        if self.bridge is None:
+            self.bridge = AsyncBridge(self.deliveries)
+            self.closing.append(self.bridge.close)
+            self.wrap_coroutines()
+        return self.bridge
+    
+    def wrap_coroutines(self):
+        """ Makes the game's coroutine functions start tasks instead. """
+        for attribute in GAME_FUNCTIONS:
+            if attribute != 'draw_world':
+                function = getattr(self, attribute)
+                setattr(self, attribute, self.bridge.wrap(
+                    function, one_at_a_time=attribute == 'update_world'))
+    
+    def run_async(self, coroutine, on_done=None):
+        """
+        Starts the coroutine as a task on the game's event loop (which is
+        started, if it was not yet). Once the task finishes, `on_done` is
+        called with the world and the coroutine's result, at the start of
+        the next frame.
+        
+            async def load_level(name):
+                ...
+            game.run_async(load_level("two"), on_done=show_level)
+        
+        Args:
+            coroutine: The coroutine to run.
+            on_done (World,Any->None): The function given the result, if any.
+        Returns:
+            asyncio.Task: The task running the coroutine.
+        """
+        return self.enable_async().start(coroutine, on_done)
+    
+    def enable_workers(self, workers: int = None, processes: bool = False):
+        """
+        Starts a pool of threads (or processes) for submit to run work on.
+        Threads suit work that waits (like reading files) or that is done
+        by code outside of Python; processes suit long Python calculations,
+        but their functions, arguments and results must all be picklable.
+        
+        Args:
+            workers (int): How many threads or processes to start; if None,
+                concurrent.futures decides.
+            processes (bool): Whether to use processes instead of threads.
+        Returns:
+            concurrent.futures.Executor: The pool.
+        """
+        if self.workers is None:
+            # Only games that use workers pay for importing them
+            import concurrent.futures
+            if processes:
+                self.workers = concurrent.futures.ProcessPoolExecutor(workers)
+            else:
+                self.workers = concurrent.futures.ThreadPoolExecutor(workers)
+            self.closing.append(self.stop_workers)
+        return self.workers
+    
+    def stop_workers(self):
+        """ Shuts the pool down, dropping any work that has not started. """
+        if self.workers is not None:
+            self.workers.shutdown(wait=False, cancel_futures=True)
+            self.workers = None
+    
+    def submit(self, function, *args, on_done=None):
+        """
+        Runs function(*args) on the pool (a pool of threads is started, if
+        there was none). Once it finishes, `on_done` is called with the
+        world and the function's result, on the game's own thread, at the
+        start of the next frame. Only on_done should change the world: the
+        function should be given copies of whatever it needs, not parts of
+        the world itself.
+        
+            game.submit(find_best_move, board_copy, on_done=make_move)
+        
+        Args:
+            function (Any->Any): The work to do.
+            args: The arguments to give the function.
+            on_done (World,Any->None): The function given the result, if any.
+        Returns:
+            concurrent.futures.Future: The future of the function's result.
+        """
+        if self.workers is None:
+            self.enable_workers()
+        future = self.workers.submit(function, *args)
+        deliveries = self.deliveries
+        future.add_done_callback(lambda done: deliveries.append((on_done, done)))
+        return future
+    
+    def deliver_results(self):
+        """
+        Gives the results of finished work to their on_done functions. If
+        the work raised an exception, it is raised again here instead.
+        """
+        while self.deliveries:
+            on_done, future = self.deliveries.popleft()
+            if future.cancelled():
+                continue
+            result = future.result()
+            if on_done is not None:
+                self.run_callback('on_done', on_done, self.world, result)
+    
+    def start_recording(self, path: str, seed: int = None, hashes: bool = True):
+        """
+        Starts recording every input event into the file at `path` (see
+        InputRecorder). The random number generator is seeded first, so
+        that replaying the recording (see replay_recording) is repeatable.
+        
+        Args:
+            path (str): The file to record into.
+            seed (int): The seed for the random module; a random one if None.
+            hashes (bool): Whether to also record a hash of every frame's world.
+        """
+        if seed is None:
+            seed = random.randrange(2**32)
+        random.seed(seed)
+        self.recorder = InputRecorder(path, seed, self.world, hashes)
+        self.closing.append(self.stop_recording)
+    
+    def stop_recording(self):
+        """ Stops recording the input, if it was being recorded. """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+    
+    def enable_profiling(self, key: int, frames: int = 60, directory: str = "."):
+        """
+        Makes the key start profiling the next few frames (see FrameProfiler),
+        so that only the steady-state game loop is profiled.
+        
+        Args:
+            key (int): The key that starts profiling.
+            frames (int): How many frames to profile.
+            directory (str): Where to write the profiles.
+        """
+        self.profiler = FrameProfiler(game_name(self.draw_world), frames, directory)
+        self.hotkeys[key] = self.profiler.start
+    
+    def enable_rewind(self, frames: int = 600, rewind_key: int = None,
+                      undo_key: int = None):
+        """
+        Starts keeping a snapshot of the world after every frame, so that the
+        game can be rewound. Snapshots share everything that did not change
+        with the one before, so unchanged frames cost almost nothing.
+        
+        Args:
+            frames (int): How many frames of snapshots to keep.
+            rewind_key (int): A key that rewinds the game by one frame.
+            undo_key (int): A key that undoes the latest change to the world.
+        """
+        self.history = collections.deque([self.snapshot()], maxlen=frames)
+        if rewind_key is not None:
+            self.hotkeys[rewind_key] = self.rewind
+        if undo_key is not None:
+            self.hotkeys[undo_key] = self.undo
+    
+    def rewind(self, frames: int = 1):
+        """
+        Puts the world back the way it was the given number of frames ago
+        (or as far back as the snapshots go).
+        """
+        for frame in range(min(frames, len(self.history) - 1)):
+            self.history.pop()
+        self.replace_world(restore_snapshot(self.history[-1]))
+    
+    def undo(self):
+        """ Puts the world back the way it was before it last changed. """
+        current = self.snapshot(self.history[-1])
+        while len(self.history) > 1 and self.history[-1] is current:
+            self.history.pop()
+        self.replace_world(restore_snapshot(self.history[-1]))
+    
+    def snapshot(self, previous=None):
+        """
+        Takes a snapshot of the world (see snapshot_world), sharing
+        everything that did not change with the `previous` snapshot.
+        """
+        return snapshot_world(self.world, previous)
+    
+    def replace_world(self, world):
+        """ Replaces the current world with a different one. """
+        self.world = world
+    
+    def on_close(self):
+        """ Called when the window is closed """
+        for action in self.closing:
+            action()
+    
+    def world_fingerprint(self):
+        """
+        Produces a value that changes whenever the world changes, by
+        describing the entire world as a string.
+        """
+        return repr(self.world)
     
     def on_draw(self):
         """ Called when it is time to draw the world """
-        arcade.start_render()
-        self.draw_world(self.world)
+        self.run_callback('on_draw', self.draw_frame)
+    
+    def draw_frame(self):
+        """ Draws the world, or shows the last frame again if it is unchanged. """
+        if self.skip_unchanged_draws and not self.interpolate:
+            fingerprint = self.world_fingerprint()
+            if fingerprint != self.drawn_fingerprint:
+                self.drawn_fingerprint = fingerprint
+                self.drawn_frame = None
+            elif self.window is None:
+                return
+            elif self.drawn_frame is not None:
+                self.window.show_frame(self.drawn_frame)
+                return
+            else:
+                # Unchanged for the first time, so save this frame for later
+                self.draw()
+                self.drawn_frame = self.window.save_frame()
+                return
+        if self.interpolate and self.simulation_step:
+            self.draw(self.time_behind / self.simulation_step)
+        else:
+            self.draw()
+    
+    def frame_finished(self):
+        """ Called at the end of every frame, once it has been drawn """
+        if self.garbage is not None:
+            self.garbage.frame_finished()
+    
+    def draw(self, *args):
+        """ Calls draw_world, batching up its drawing if asked to. """
+        if self.batcher is None:
+            self.run_callback('draw_world', self.draw_world, self.world, *args)
+            return
+        self.batcher.start()
+        try:
+            self.run_callback('draw_world', self.draw_world, self.world, *args)
+        finally:
+            self.run_callback('flush_draws', self.batcher.finish)
     
     def on_update(self, delta_time: float):
         """ Called every frame """
-        self.update_world(self.world)
+        if self.reloader is not None and self.reloader.changed():
+            self.reload()
+        if self.profiler is not None:
+            self.profiler.frame_started()
+        if self.garbage is not None:
+            self.garbage.frame_started()
+        for instrument in self.instruments:
+            instrument.frame_started()
+        self.run_callback('on_update', self.update_frame, delta_time)
+    
+    def update_frame(self, delta_time: float):
+        """ Updates the world (and everything keeping track of it) for a frame. """
+        if self.flight is not None:
+            self.flight.frame(delta_time)
+        if self.bridge is not None:
+            self.run_callback('asyncio', self.bridge.step)
+        if self.deliveries:
+            self.deliver_results()
+        if self.motions:
+            self.deliver_motions()
+        if self.simulation_step is None:
+            self.run_callback('update_world', self.update_world, self.world)
+        else:
+            self.step_simulation(delta_time)
+        if self.recorder is not None:
+            self.recorder.frame(delta_time, self.world)
+        if self.history is not None:
+            self.history.append(self.snapshot(self.history[-1]))
+        if self.flight is not None:
+            self.flight.frame_finished(self)
+    
+    def step_simulation(self, delta_time: float):
+        """ Updates the world once for each simulation step that has passed. """
+        self.time_behind += delta_time
+        steps = 0
+        while self.time_behind >= self.simulation_step:
+            if steps == self.max_catch_up:
+                # Too far behind to catch up, so let the simulation slow down
+                self.time_behind %= self.simulation_step
+                break
+            self.run_callback('update_world', self.update_world, self.world)
+            self.time_behind -= self.simulation_step
+            steps += 1
     
     def on_key_press(self, key: int, modifiers: int):
         """ Called when the keyboard is pressed """
+        if key in self.hotkeys:
+            self.hotkeys[key]()
+            return
+        if self.recorder is not None:
+            self.recorder.event('on_key_press', key, modifiers)
+        if self.flight is not None:
+            self.flight.event('on_key_press', key, modifiers)
         if self.handle_key is not None:
-            self.handle_key(self.world, key)
+            self.run_callback('handle_key', self.handle_key, self.world, key)
     
     def on_key_release(self, key: int, modifiers: int):
         """ Called when a keyboard is released """
+        if self.recorder is not None:
+            self.recorder.event('on_key_release', key, modifiers)
+        if self.flight is not None:
+            self.flight.event('on_key_release', key, modifiers)
         if self.handle_release is not None:
-            self.handle_release(self.world, key)
+            self.run_callback('handle_release', self.handle_release, self.world, key)
     
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
         """ Called when the mouse is pressed """
+        if self.recorder is not None:
+            self.recorder.event('on_mouse_press', x, y, button, modifiers)
+        if self.flight is not None:
+            self.flight.event('on_mouse_press', x, y, button, modifiers)
         if self.handle_mouse is not None:
-            button_str = ('left' if button == arcade.MOUSE_BUTTON_LEFT
-                          else 'right' if button == arcade.MOUSE_BUTTON_RIGHT
-                          else 'middle' if button == arcade.MOUSE_BUTTON_MIDDLE
-                          else 'unknown')
-            self.handle_mouse(self.world, x, y, button_str)
+            button_str = MOUSE_BUTTON_NAMES.get(button, 'unknown')
+            self.run_callback('handle_mouse', self.handle_mouse, self.world, x, y, button_str)
     
     def on_mouse_motion(self, x: int, y: int, dx: int, dy: int):
         """ Called when the mouse is moved """
-        if self.handle_motion is not None:
-            self.handle_motion(self.world, x, y)
-
-BETTER_TYPE_NAMES = {
-    str: 'string',
-    int: 'integer',
-    float: 'float',
-    bool: 'boolean',
-    dict: 'dictionary',
-    list: 'list'
-    }
-
-def get_name(value):
-    try:
-        return BETTER_TYPE_NAMES.get(value, value.__name__)
-    except Exception:
-        return str(value)[8:-2]
+        if self.recorder is not None:
+            self.recorder.event('on_mouse_motion', x, y, dx, dy)
+        if self.flight is not None:
+            self.flight.event('on_mouse_motion', x, y, dx, dy)
+        if self.handle_motion is None:
+            return
+        if self.coalesce_motion == 'all':
+            self.motions.append({'x': x, 'y': y})
+        elif self.coalesce_motion:
+            self.motions = [(x, y)]
+        else:
+            self.run_callback('handle_motion', self.handle_motion, self.world, x, y)
     
-def make_key_list(values):
-    if not values:
-        return "and there were no keys at all"
-    elif len(values) == 1:
-        return "but there was the key {!r}".format(values[0])
-    else:
-        return "but there were the keys "+ (", ".join(map(repr, values[:-1]))) + " and {!r}".format(values[-1])
-
-WRONG_TYPE_MESSAGE = " was the wrong type. Expected type was {y_type!r}, but actual value was {x} ({x_type!r})."
-WRONG_KEY_TYPE_MESSAGE = " had a wrong type for a key. Expected type of all keys was {y_type!r}, but there was the key {x} ({x_type!r})."
-MISSING_KEY_MESSAGE = " was missing the key {!r}, {}."
-EXTRA_KEYS_MESSAGE = " had all the correct keys ({}), but also had these unexpected keys: {}"
-
-def _validate_dictionary_type(value, expected_type, path):
-    if not isinstance(value, dict):
-        return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type="dictionary")
-    for expected_key, expected_value in expected_type.items():
-        if isinstance(expected_key, str):
-            if expected_key not in value:
-                return path + MISSING_KEY_MESSAGE.format(expected_key, make_key_list(list(value.keys())))
-            reason = _validate_type(value[expected_key], expected_value,
-                                    path+"[{!r}]".format(expected_key))
-            if reason:
-                return reason
-        elif isinstance(expected_key, type):
-            for k, v in value.items():
-                new_path = path+"[{!r}]".format(k)
-                if not isinstance(k, expected_key):
-                    return path + WRONG_KEY_TYPE_MESSAGE.format(x=repr(k), x_type=get_name(type(k)), y_type=get_name(expected_key))
-                reason = _validate_type(v, expected_value, new_path)
-                if reason:
-                    return reason
-            break # only support one key/value type in Lookup style
-    else:
-        if len(expected_type) != len(value):
-            unexpected_keys = set(value.keys()) - set(expected_type.keys())
-            unexpected_keys = ", ".join(map(repr, unexpected_keys))
-            expected_keys = ", ".join(map(repr, expected_type))
-            return path + EXTRA_KEYS_MESSAGE.format(expected_keys, unexpected_keys)
+    def deliver_motions(self):
+        """ Calls handle_motion once with the mouse movements saved up. """
+        motions, self.motions = self.motions, []
+        if self.coalesce_motion == 'all':
+            self.run_callback('handle_motion', self.handle_motion, self.world, motions)
+        else:
+            x, y = motions[-1]
+            self.run_callback('handle_motion', self.handle_motion, self.world, x, y)
+
+class HotReloader:
+    """
+    Watches a file for changes (by when it was last modified), and runs it
+    again as a fresh module when asked. The module is given its usual name
+    rather than "__main__", so the game's `if __name__ == '__main__':` part
+    does not start another game. It is not put into sys.modules, and it is
+    compiled straight from the source, so no stale bytecode is ever used.
+    
+    Args:
+        path (str): The file to watch.
+        name (str): The name to give the module.
+        interval (float): The seconds between looks at the file.
+    
+    Attributes:
+        modified (int): When the file was last modified, as last seen.
+        reloads (int): How many times the file was run again.
+    """
+    def __init__(self, path: str, name: str, interval: float = 0.5):
+        self.path = path
+        self.name = name
+        self.interval = interval
+        self.modified = self.modified_time()
+        self.checked = time.perf_counter()
+        self.reloads = 0
+    
+    def modified_time(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def changed(self) -> bool:
+        """ Checks (at most once per interval) whether the file was modified. """
+        now = time.perf_counter()
+        if now - self.checked < self.interval:
+            return False
+        self.checked = now
+        modified = self.modified_time()
+        if modified is None or modified == self.modified:
+            return False
+        self.modified = modified
+        return True
+    
+    def load(self):
+        """ Runs the file as a new module, and produces the module. """
+        with open(self.path, 'rb') as source:
+            code = compile(source.read(), self.path, 'exec')
+        module = types.ModuleType(self.name)
+        module.__file__ = self.path
+        exec(code, module.__dict__)
+        self.reloads += 1
+        return module
 
-def _validate_type(value, expected_type, path="world"):
+def _record_classes(expected_type, found: dict) -> dict:
+    ''' Collects the Record classes used in the type, by their names. '''
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        found.setdefault(expected_type.__name__, expected_type)
+        expected_type = expected_type._schema
     if isinstance(expected_type, dict):
-        return _validate_dictionary_type(value, expected_type, path)
+        for child in expected_type.values():
+            _record_classes(child, found)
+    elif isinstance(expected_type, list):
+        for child in expected_type:
+            _record_classes(child, found)
+    return found
+
+def _reuse_record_classes(expected_type, old_records: dict):
+    '''
+    Produces the type with each Record class replaced by the old class of
+    the same name, if their schemas (with their own Record classes
+    replaced) are exactly the same.
+    '''
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        old = old_records.get(expected_type.__name__)
+        schema = _reuse_record_classes(expected_type._schema, old_records)
+        if old is not None and _schema_key(schema) == _schema_key(old._schema):
+            return old
+    elif isinstance(expected_type, dict):
+        return {key: _reuse_record_classes(child, old_records)
+                for key, child in expected_type.items()}
     elif isinstance(expected_type, list):
-        if not isinstance(value, list):
-            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type="list")
-        if not expected_type and value:
-            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type="empty list")
-        for index, element in enumerate(value):
-            reason = _validate_type(element, expected_type[0], path+"[{}]".format(index))
-            if reason:
-                return reason
-    elif expected_type == float:
-        if not isinstance(value, (int, float)) and value is not None:
-            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type=get_name(expected_type))
-    elif not isinstance(value, expected_type) and value is not None:
-        return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type=get_name(expected_type))
+        return [_reuse_record_classes(child, old_records) for child in expected_type]
+    return expected_type
+
+class AsyncBridge:
+    """
+    Runs an asyncio event loop for the game, one step at a time: each step
+    runs everything that is ready (like tasks whose `await` just finished),
+    without waiting for anything else. Stepping once per frame keeps the
+    game's coroutines on the game's own thread, so they can safely change
+    the world.
+    
+    Args:
+        deliveries (deque): Where to put the (on_done, task) pairs of
+            finished tasks, for Cisc108GameUntyped.deliver_results.
+    
+    Attributes:
+        loop (asyncio.AbstractEventLoop): The game's event loop.
+        tasks (set): The tasks that have not finished yet.
+    """
+    def __init__(self, deliveries: collections.deque):
+        # Importing asyncio is slow, and most games never need it
+        import asyncio
+        self.deliveries = deliveries
+        self.loop = asyncio.new_event_loop()
+        self.tasks = set()
+    
+    def step(self):
+        """ Runs everything that is ready to run on the loop, once. """
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+    
+    def start(self, coroutine, on_done=None) -> 'asyncio.Task':
+        """ Starts the coroutine, delivering its result to on_done later. """
+        task = self.loop.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(functools.partial(self.finished, on_done))
+        return task
+    
+    def finished(self, on_done, task: 'asyncio.Task'):
+        self.tasks.discard(task)
+        self.deliveries.append((on_done, task))
+    
+    def wrap(self, function, one_at_a_time: bool = False):
+        """
+        Produces a function that starts the coroutine function as a task
+        and returns right away, or the function itself if it is not a
+        coroutine function.
+        
+        Args:
+            function: The function to wrap.
+            one_at_a_time (bool): Whether calls are skipped (without making
+                a coroutine at all) while the last task has not finished.
+        """
+        import inspect
+        if not inspect.iscoroutinefunction(function):
+            return function
+        running = None
+        @functools.wraps(function)
+        def start_task(*args):
+            nonlocal running
+            if one_at_a_time and running is not None and not running.done():
+                return
+            running = self.start(function(*args))
+        return start_task
+    
+    def close(self):
+        """ Cancels the unfinished tasks, and closes the loop. """
+        import asyncio
+        for task in self.tasks:
+            task.cancel()
+        if self.tasks:
+            self.loop.run_until_complete(
+                asyncio.gather(*self.tasks, return_exceptions=True))
+        self.loop.close()
+
+class CallbackTimings:
+    """
+    An instrument that times each call to the game's functions, keeping
+    the latest `samples` times for each function.
+    
+    Args:
+        samples (int): How many of the latest times to keep per function.
+    
+    Attributes:
+        times (dict): Maps each function's name to its latest times (seconds).
+        calls (dict): Maps each function's name to how often it was called.
+    """
+    def __init__(self, samples: int = 1000):
+        self.samples = samples
+        self.times = {}
+        self.calls = {}
+    
+    def start(self, name: str) -> float:
+        return time.perf_counter()
+    
+    def frame_started(self):
+        pass
+    
+    def stop(self, name: str, started: float):
+        elapsed = time.perf_counter() - started
+        if name not in self.times:
+            self.times[name] = collections.deque(maxlen=self.samples)
+            self.calls[name] = 0
+        self.times[name].append(elapsed)
+        self.calls[name] += 1
+    
+    def report(self) -> dict:
+        """
+        Summarizes the latest times of each function, in milliseconds.
+        
+        Returns:
+            dict: Maps each function's name to its number of 'calls', and
+                the 'p50', 'p95', 'p99' and 'max' of its latest times.
+        """
+        report = {}
+        for name, times in self.times.items():
+            ordered = sorted(times)
+            percentile = lambda p: 1000 * ordered[min(len(ordered)-1, int(p*len(ordered)))]
+            report[name] = {'calls': self.calls[name],
+                            'p50': percentile(.50), 'p95': percentile(.95),
+                            'p99': percentile(.99), 'max': 1000 * ordered[-1]}
+        return report
+    
+    def write(self, path: str):
+        """ Writes the report to the path, as CSV or JSON (by its extension). """
+        report = self.report()
+        with open(path, 'w', newline='') as output:
+            if path.endswith('.csv'):
+                writer = csv.writer(output)
+                writer.writerow(['name', 'calls', 'p50', 'p95', 'p99', 'max'])
+                for name, row in report.items():
+                    writer.writerow([name, row['calls'], row['p50'],
+                                     row['p95'], row['p99'], row['max']])
+            else:
+                json.dump(report, output, indent=2)
+
+class AllocationTracker:
+    """
+    An instrument that tracks the memory allocated by each call to the
+    game's functions (using tracemalloc), and how long each generation of
+    the garbage collector takes. Every `every` frames, the memory held at
+    the start of two frames in a row is compared, to find the source lines
+    whose memory grew the most during a frame (memory that is allocated and
+    freed within the frame only shows up in the functions' peak bytes).
+    
+    Args:
+        every (int): How many frames to wait between comparing frames.
+        top (int): How many source lines to report.
+    
+    Attributes:
+        calls (dict): Maps each function's name to how often it was called.
+        allocated (dict): Maps each function's name to the total bytes,
+            blocks, and peak bytes (above the start) its calls allocated.
+        lines (Counter): Maps each source line to how many bytes its memory
+            grew by in the frames that were compared.
+        collections (dict): Maps each generation to its latest pauses (seconds).
+        peaks (list): The highest memory seen so far by each call that has
+            not stopped yet, innermost last.
+    """
+    def __init__(self, every: int = 60, top: int = 10):
+        self.every = every
+        self.top = top
+        self.calls = {}
+        self.allocated = {}
+        self.lines = collections.Counter()
+        self.blocks = collections.Counter()
+        self.frames = 0
+        self.frames_compared = 0
+        self.peaks = []
+        self.snapshot = None
+        self.collections = {generation: collections.deque(maxlen=1000)
+                            for generation in range(3)}
+        self.collecting = None
+        # Only games that track their memory pay for importing tracemalloc
+        import tracemalloc
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        gc.callbacks.append(self.time_collection)
+    
+    def stop_tracking(self):
+        """ Stops tracing memory (if this started it) and timing collections. """
+        if self.time_collection in gc.callbacks:
+            gc.callbacks.remove(self.time_collection)
+        import tracemalloc
+        if self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    
+    def time_collection(self, phase: str, info: dict):
+        if phase == 'start':
+            self.collecting = time.perf_counter()
+        elif self.collecting is not None:
+            self.collections[info['generation']].append(time.perf_counter() - self.collecting)
+            self.collecting = None
+    
+    def start(self, name: str) -> tuple:
+        # Resetting the peak would lose the peak of the enclosing call, so
+        # it is kept on the stack first (and the stopped call's folded in)
+        import tracemalloc
+        size, peak = tracemalloc.get_traced_memory()
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self.peaks.append(size)
+        return size, sys.getallocatedblocks()
+    
+    def stop(self, name: str, started: tuple):
+        import tracemalloc
+        size, peak = tracemalloc.get_traced_memory()
+        peak = max(self.peaks.pop(), peak)
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], peak)
+        blocks = sys.getallocatedblocks()
+        if name not in self.allocated:
+            self.allocated[name] = [0, 0, 0]
+            self.calls[name] = 0
+        totals = self.allocated[name]
+        totals[0] += size - started[0]
+        totals[1] += blocks - started[1]
+        totals[2] = max(totals[2], peak - started[0])
+        self.calls[name] += 1
+    
+    def frame_started(self):
+        self.frames += 1
+        if self.snapshot is not None:
+            differences = self.take_snapshot().compare_to(self.snapshot, 'lineno')
+            for difference in differences:
+                if difference.size_diff > 0:
+                    frame = difference.traceback[0]
+                    line = "{}:{}".format(frame.filename, frame.lineno)
+                    self.lines[line] += difference.size_diff
+                    self.blocks[line] += difference.count_diff
+            self.frames_compared += 1
+            self.snapshot = None
+        elif self.frames % self.every == 0:
+            self.snapshot = self.take_snapshot()
+    
+    def take_snapshot(self):
+        # Leave out the memory used by tracemalloc and this tracker
+        import tracemalloc
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<unknown>")])
+    
+    def report(self) -> dict:
+        """
+        Summarizes the memory allocated by each function and source line,
+        and the garbage collector's pauses (in milliseconds).
+        
+        Returns:
+            dict: The 'functions' (mapping each function's name to its number
+                of 'calls', and the 'bytes', 'blocks' and 'peak bytes' per
+                call), the top source 'lines' (with their 'bytes' and 'blocks'
+                per frame), and the 'collections' (mapping each generation to
+                its number of 'pauses', and their 'p50', 'max' and 'total').
+        """
+        functions = {}
+        for name, (size, blocks, peak) in self.allocated.items():
+            calls = self.calls[name]
+            functions[name] = {'calls': calls, 'bytes': size / calls,
+                               'blocks': blocks / calls, 'peak bytes': peak}
+        frames = self.frames_compared or 1
+        lines = [{'line': line, 'bytes': size / frames,
+                  'blocks': self.blocks[line] / frames}
+                 for line, size in self.lines.most_common(self.top)]
+        pauses = {}
+        for generation, times in self.collections.items():
+            ordered = sorted(times)
+            pauses[generation] = {
+                'pauses': len(ordered),
+                'p50': 1000 * ordered[len(ordered)//2] if ordered else 0,
+                'max': 1000 * ordered[-1] if ordered else 0,
+                'total': 1000 * sum(ordered)}
+        return {'functions': functions, 'lines': lines, 'collections': pauses}
+    
+    def write(self, path: str):
+        """ Writes the report to the path, as JSON. """
+        with open(path, 'w') as output:
+            json.dump(self.report(), output, indent=2)
+
+class GarbageScheduler:
+    """
+    Keeps the garbage collector's longest pauses (collecting its oldest
+    generation) out of the middle of frames. Once the first frame has been
+    drawn, everything made so far (the initial world, the textures, and the
+    game itself) is frozen, so that collections skip it, and automatic
+    collections of the oldest generation are turned off. Instead, whenever
+    one is due and a frame finishes with plenty of its budget left, it is
+    run before the next frame. In case no frame ever has time to spare, one
+    is forced once it is `force_after` times overdue.
+    
+    Args:
+        budget (float): The seconds each frame should take.
+        spare (float): How much of the budget (from 0 to 1) must be left
+            to collect at the end of a frame.
+        force_after (int): How many times overdue a collection can get
+            before it is forced.
+    
+    Attributes:
+        threshold (tuple): The garbage collector's original thresholds.
+        frozen (bool): Whether the first frame's objects have been frozen.
+        collected (int): How many collections were run between frames.
+        forced (int): How many collections had to be forced.
+    """
+    def __init__(self, budget: float, spare: float = 0.5, force_after: int = 10):
+        self.budget = budget
+        self.spare = spare
+        self.force_after = force_after
+        self.threshold = gc.get_threshold()
+        self.frozen = False
+        self.started = None
+        self.collected = 0
+        self.forced = 0
+    
+    def overdue(self) -> float:
+        """ How many times over the oldest generation's threshold it is. """
+        return gc.get_count()[2] / max(1, self.threshold[2])
+    
+    def freeze(self):
+        gc.collect()
+        gc.freeze()
+        young, middle, old = self.threshold
+        gc.set_threshold(young, middle, 2**30)
+        self.frozen = True
+    
+    def frame_started(self):
+        self.started = time.perf_counter()
+        if self.frozen and self.overdue() >= self.force_after:
+            gc.collect(2)
+            self.forced += 1
+    
+    def frame_finished(self):
+        if not self.frozen:
+            self.freeze()
+        elif self.started is not None and self.overdue() >= 1:
+            left = self.budget - (time.perf_counter() - self.started)
+            if left >= self.spare * self.budget:
+                gc.collect(2)
+                self.collected += 1
+        self.started = None
+    
+    def stop(self):
+        """ Gives the garbage collector back its usual thresholds. """
+        gc.set_threshold(*self.threshold)
+        gc.unfreeze()
+        self.frozen = False
+
+# The Tracers currently recording, which trace() adds its spans to
+_TRACERS = []
+
+class Tracer:
+    """
+    An instrument that records a timeline of the game, in the trace event
+    format that chrome://tracing and Perfetto can show. Every call to the
+    game's functions (on_update and on_draw, and the handle_*, draw_world,
+    update_world and world checks inside them) becomes a span, as does
+    every garbage collection and every `with trace("name"):` block in the
+    game's own code. The start of each frame is marked too.
+    
+    Args:
+        label (str): The name of the game, shown in the timeline.
+        events (int): How many of the latest events to keep.
+    
+    Attributes:
+        events (deque): The recorded events, as dictionaries.
+    """
+    def __init__(self, label: str = "game", events: int = 200000):
+        self.label = label
+        self.events = collections.deque(maxlen=events)
+        self.collecting = None
+        _TRACERS.append(self)
+        gc.callbacks.append(self.trace_collection)
+    
+    def stop_tracing(self):
+        """ Stops adding spans from trace() and the garbage collector. """
+        if self in _TRACERS:
+            _TRACERS.remove(self)
+        if self.trace_collection in gc.callbacks:
+            gc.callbacks.remove(self.trace_collection)
+    
+    def span(self, name: str, started: int, category: str = "game"):
+        """ Records a span from the `started` time (in nanoseconds) until now. """
+        now = time.perf_counter_ns()
+        self.events.append({'name': name, 'cat': category, 'ph': 'X',
+                            'ts': started / 1000, 'dur': (now - started) / 1000,
+                            'pid': 0, 'tid': threading.get_ident()})
+    
+    def trace_collection(self, phase: str, info: dict):
+        if phase == 'start':
+            self.collecting = time.perf_counter_ns()
+        elif self.collecting is not None:
+            self.span("gc (generation {})".format(info['generation']), self.collecting, "gc")
+            self.collecting = None
+    
+    def start(self, name: str) -> int:
+        return time.perf_counter_ns()
+    
+    def stop(self, name: str, started: int):
+        self.span(name, started)
+    
+    def frame_started(self):
+        self.events.append({'name': 'frame', 'cat': 'frame', 'ph': 'i', 's': 'p',
+                            'ts': time.perf_counter_ns() / 1000,
+                            'pid': 0, 'tid': threading.get_ident()})
+    
+    def write(self, path: str):
+        """ Writes the timeline to the path, as trace event JSON. """
+        names = [{'name': 'process_name', 'ph': 'M', 'pid': 0, 'args': {'name': self.label}}]
+        with open(path, 'w') as output:
+            json.dump({'traceEvents': names + list(self.events),
+                       'displayTimeUnit': 'ms'}, output)
+
+class _TraceSpan:
+    __slots__ = ('name', 'started')
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.started = None
+    
+    def __enter__(self):
+        if _TRACERS:
+            self.started = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exception):
+        if self.started is not None:
+            for tracer in _TRACERS:
+                tracer.span(self.name, self.started, "user")
+
+def trace(name: str):
+    """
+    Marks a part of the game's own code, so that it shows up as its own span
+    in the timeline when tracing is enabled (see enable_tracing). Otherwise,
+    it does (almost) nothing.
+    
+        with trace("move dots"):
+            for dot in world['red dots']:
+                move_dot(dot)
+    
+    Args:
+        name (str): The name of the span.
+    """
+    return _TraceSpan(name)
+
+def game_name(function) -> str:
+    """ Produces the name of the module (or script) the function is from. """
+    name = getattr(function, '__module__', None) or 'game'
+    if name == '__main__':
+        path = getattr(sys.modules['__main__'], '__file__', None)
+        if path:
+            name = os.path.splitext(os.path.basename(path))[0]
+    return name
+
+class FrameProfiler:
+    """
+    Profiles a fixed number of frames, once started. Two files are written
+    when it is done, named after the game and the time: a ".prof" file of
+    cProfile statistics (for pstats or snakeviz), and a ".folded" file of
+    sampled call stacks, one "outer;inner count" line per stack, ready for
+    flamegraph tools.
+    
+    Args:
+        label (str): The name to put at the start of the files.
+        frames (int): How many frames to profile.
+        directory (str): Where to write the files.
+        interval (float): The seconds between samples of the call stack.
+    
+    Attributes:
+        frames_left (int): The frames still to profile, or None if not started.
+    """
+    def __init__(self, label: str, frames: int = 60, directory: str = ".",
+                 interval: float = 0.001):
+        self.label = label
+        self.frames = frames
+        self.directory = directory
+        self.interval = interval
+        self.frames_left = None
+    
+    def start(self):
+        """ Starts profiling, from the start of the next frame. """
+        if self.frames_left is None:
+            self.frames_left = self.frames + 1
+    
+    def frame_started(self):
+        if self.frames_left is None:
+            return
+        self.frames_left -= 1
+        if self.frames_left == self.frames:
+            self.begin()
+        elif self.frames_left == 0:
+            self.end()
+            self.frames_left = None
+    
+    def begin(self):
+        self.stacks = collections.Counter()
+        self.sampling = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True,
+                                        args=(threading.get_ident(),))
+        self.sampler.start()
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+    
+    def sample(self, thread_id):
+        """ Counts the call stacks of the game's thread, until told to stop. """
+        while not self.sampling.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name,
+                             os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+    
+    def end(self):
+        self.profile.disable()
+        self.sampling.set()
+        self.sampler.join()
+        path = os.path.join(self.directory, "{}-{}".format(
+            self.label, time.strftime("%Y%m%d-%H%M%S")))
+        self.profile.dump_stats(path + ".prof")
+        with open(path + ".folded", 'w') as folded:
+            for stack, count in self.stacks.most_common():
+                folded.write("{} {}\n".format(stack, count))
+        print("Profiled {} frames into {}.prof and {}.folded".format(self.frames, path, path))
+
+class _DictSnapshot(tuple):
+    """ A frozen dictionary in a snapshot, as a tuple of (key, value) pairs. """
+    __slots__ = ()
+
+class _ListSnapshot(tuple):
+    """ A frozen list in a snapshot. """
+    __slots__ = ()
+
+class _RecordSnapshot(tuple):
+    """ A frozen Record in a snapshot, as its class followed by its fields. """
+    __slots__ = ()
+
+def snapshot_world(world, previous=None):
+    """
+    Produces a frozen copy of the world. Any part of the world that is
+    equal to the same part of the `previous` snapshot is not copied again;
+    the new snapshot simply shares it (and is the previous snapshot itself,
+    if nothing changed at all). So memory only grows with what changed.
+    
+    Values that are not dictionaries, lists or records are shared with the
+    world instead of copied, since they are expected to never change.
+    
+    Args:
+        world (World): The world to take a snapshot of.
+        previous: An earlier snapshot of the same world, if any.
+    Returns:
+        A snapshot of the world, for restore_snapshot.
+    """
+    if isinstance(world, dict):
+        if type(previous) is not _DictSnapshot or len(previous) != len(world):
+            return _DictSnapshot([(key, snapshot_world(child)) for key, child in world.items()])
+        # Quickly reuse unchanged dictionaries of primitives (like positions)
+        if (previous == tuple(world.items()) and
+                list(map(type, world.values())) == [type(child) for key, child in previous]):
+            return previous
+        items, same = [], True
+        for (key, child), (old_key, old_child) in zip(world.items(), previous):
+            if key != old_key:
+                old_child = None
+            frozen = snapshot_world(child, old_child)
+            same = same and frozen is old_child
+            items.append((key, frozen))
+        return previous if same else _DictSnapshot(items)
+    elif isinstance(world, list):
+        if type(previous) is not _ListSnapshot:
+            return _ListSnapshot([snapshot_world(child) for child in world])
+        # Quickly reuse unchanged lists of primitives (like rows of a grid)
+        if (len(previous) == len(world) and previous == tuple(world) and
+                list(map(type, previous)) == list(map(type, world))):
+            return previous
+        elements, same = [], len(previous) == len(world)
+        old_elements = itertools.chain(previous, itertools.repeat(None))
+        for child, old_child in zip(world, old_elements):
+            frozen = snapshot_world(child, old_child)
+            same = same and frozen is old_child
+            elements.append(frozen)
+        return previous if same else _ListSnapshot(elements)
+    elif isinstance(world, Record):
+        fields = [getattr(world, name) for name in world._fields.values()]
+        if type(previous) is not _RecordSnapshot or previous[0] is not world._record:
+            return _RecordSnapshot([world._record] + [snapshot_world(child) for child in fields])
+        if (previous[1:] == tuple(fields) and
+                list(map(type, fields)) == list(map(type, previous[1:]))):
+            return previous
+        frozen = [snapshot_world(child, old_child) for child, old_child in zip(fields, previous[1:])]
+        if all(map(operator.is_, frozen, previous[1:])):
+            return previous
+        return _RecordSnapshot([world._record] + frozen)
+    elif type(world) is type(previous) and world == previous:
+        return previous
+    return world
+
+def restore_snapshot(snapshot):
+    """ Produces a new world (with fresh dictionaries and lists) from a snapshot. """
+    if type(snapshot) is _DictSnapshot:
+        return {key: restore_snapshot(child) for key, child in snapshot}
+    elif type(snapshot) is _ListSnapshot:
+        return [restore_snapshot(child) for child in snapshot]
+    elif type(snapshot) is _RecordSnapshot:
+        return snapshot[0](*[restore_snapshot(child) for child in snapshot[1:]])
+    return snapshot
+
+def diff_worlds(old, new, World, path: str = "world") -> list:
+    """
+    Compares two worlds of the same World type, and produces a patch that
+    turns the old one into the new one (see apply_patch). Each change is a
+    tuple starting with its operation and the path of the value it changes,
+    written the same way as in the messages about wrong types:
+    
+        ('set', "world['grid'][3][7]", 'blue')
+        ('delete', "world['scores']['ada']")
+        ('insert', "world['red dots']", 4, [new_dot])
+        ('remove', "world['red dots']", 0, 1)
+    
+    Lists only have their changed elements set; elements added or removed
+    (at any one place in the list) become a single insert or remove.
+    
+    Args:
+        old (World): The world before.
+        new (World): The world after.
+        World (dict): The type of both worlds.
+        path (str): The path of the worlds, if they are part of another value.
+    Returns:
+        list: The changes, in the order they should be applied.
+    """
+    patch = []
+    _diff_into(patch, old, new, World, path)
+    return patch
+
+def _diff_into(patch, old, new, expected_type, path):
+    if old is new:
+        return
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        if (isinstance(old, Record) and isinstance(new, Record) and
+                old._record is new._record):
+            for key in new:
+                _diff_into(patch, old[key], new[key], expected_type._schema[key],
+                           path+"[{!r}]".format(key))
+            return
+    elif isinstance(expected_type, dict):
+        if isinstance(old, dict) and isinstance(new, dict):
+            fields, lookup = _split_dictionary_type(expected_type)
+            for key in old:
+                if key not in new:
+                    patch.append(('delete', path+"[{!r}]".format(key)))
+            for key, child in new.items():
+                child_path = path+"[{!r}]".format(key)
+                if key in old:
+                    child_type = fields.get(key, lookup[1] if lookup else None)
+                    _diff_into(patch, old[key], child, child_type, child_path)
+                else:
+                    patch.append(('set', child_path, _copy_value(child)))
+            return
+    elif isinstance(expected_type, list):
+        if isinstance(old, list) and isinstance(new, list):
+            element_type = expected_type[0] if expected_type else None
+            # Skip past the elements that are the same at either end
+            start, shortest = 0, min(len(old), len(new))
+            while start < shortest and _same_value(old[start], new[start]):
+                start += 1
+            end = 0
+            while end < shortest - start and _same_value(old[-1-end], new[-1-end]):
+                end += 1
+            old_middle, new_middle = old[start:len(old)-end], new[start:len(new)-end]
+            common = min(len(old_middle), len(new_middle))
+            for index in range(common):
+                _diff_into(patch, old_middle[index], new_middle[index], element_type,
+                           path+"[{}]".format(start+index))
+            if len(new_middle) > common:
+                patch.append(('insert', path, start+common, _copy_value(new_middle[common:])))
+            elif len(old_middle) > common:
+                patch.append(('remove', path, start+common, len(old_middle)-common))
+            return
+    if _same_value(old, new):
+        return
+    patch.append(('set', path, _copy_value(new)))
+
+def _same_value(old, new) -> bool:
+    """
+    Whether the two values are equal, with exactly the same types all the
+    way down (so 1, 1.0 and True are all different). Tracked containers
+    count as the same type as plain ones.
+    """
+    if old is new:
+        return True
+    if old != new:
+        return False
+    if isinstance(old, Record):
+        return (isinstance(new, Record) and old._record is new._record and
+                all(_same_value(child, new[key]) for key, child in old.items()))
+    elif isinstance(old, dict):
+        return (isinstance(new, dict) and not isinstance(new, Record) and
+                all(_same_value(child, new[key]) for key, child in old.items()))
+    elif isinstance(old, list):
+        return isinstance(new, list) and all(map(_same_value, old, new))
+    return type(old) is type(new)
+
+def _copy_value(value):
+    """ Copies lists, dictionaries and records, so a patch does not share them. """
+    if isinstance(value, (dict, list, Record)):
+        return _copy_world(value)
+    return value
+
+# A path is "world" followed by keys, like "world['red dots'][3]['x']"
+PATH_KEY = re.compile(r"""\[((?:'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[^\]'"])*)\]""")
+
+@functools.lru_cache(maxsize=4096)
+def _parse_path(path: str) -> tuple:
+    """ Produces the keys (and indexes) in the path, in order. """
+    start = path.find('[')
+    if start == -1:
+        return ()
+    # Only patches use paths, so ast is not imported with the rest
+    import ast
+    keys, position = [], start
+    for match in PATH_KEY.finditer(path, start):
+        if match.start() != position:
+            break
+        keys.append(ast.literal_eval(match.group(1)))
+        position = match.end()
+    if position != len(path):
+        raise ValueError("Could not understand the path {!r}".format(path))
+    return tuple(keys)
+
+def apply_patch(world, patch: list):
+    """
+    Changes the world by applying the patch made by diff_worlds. The values
+    in the patch are copied, so the same patch can be applied many times.
+    
+    Args:
+        world (World): The world to change (usually, the old world given to
+            diff_worlds).
+        patch (list): The changes.
+    Returns:
+        World: The changed world, which is the same world unless the patch
+            replaced it entirely.
+    """
+    for operation, path, *arguments in patch:
+        keys = _parse_path(path)
+        if operation in ('insert', 'remove'):
+            target = world
+            for key in keys:
+                target = target[key]
+            index, value = arguments
+            if operation == 'insert':
+                target[index:index] = _copy_value(value)
+            else:
+                del target[index:index+value]
+        elif not keys:
+            world = _copy_value(arguments[0]) if operation == 'set' else None
+        else:
+            target = world
+            for key in keys[:-1]:
+                target = target[key]
+            if operation == 'set':
+                target[keys[-1]] = _copy_value(arguments[0])
+            else:
+                del target[keys[-1]]
+    return world
+
+def _hash_into(hasher, value):
+    """ Feeds a description of the value into the hasher, ignoring object ids. """
+    if isinstance(value, (dict, Record)):
+        hasher.update(b'{')
+        for key, child in value.items():
+            _hash_into(hasher, key)
+            _hash_into(hasher, child)
+        hasher.update(b'}')
+    elif isinstance(value, list):
+        hasher.update(b'[')
+        for child in value:
+            _hash_into(hasher, child)
+        hasher.update(b']')
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        hasher.update(repr(value).encode())
+        hasher.update(b',')
+    else:
+        hasher.update(type(value).__name__.encode())
+        hasher.update(b',')
+
+def world_hash(world) -> bytes:
+    """
+    Produces an 8-byte hash of the world, which is the same for equal worlds
+    even across different runs of the program. Values other than
+    dictionaries, lists, and primitives only contribute their type's name.
+    """
+    hasher = hashlib.blake2b(digest_size=8)
+    _hash_into(hasher, world)
+    return hasher.digest()
+
+class InputRecorder:
+    """
+    Records input events into a compact binary file. The file starts with
+    RECORDING_MAGIC, the random seed, whether there are hashes, and the hash
+    of the initial world. Then each record is a one-byte code and its
+    fields: every event is recorded as it happens, and the end of each
+    frame is recorded with its delta_time (and the hash of the world after
+    updating, if there are hashes). So every event's frame is the number of
+    frame records before it.
+    
+    Args:
+        path (str): The file to record into.
+        seed (int): The random seed used for this recording.
+        world (World): The initial world.
+        hashes (bool): Whether to record the hash of every frame's world.
+    """
+    def __init__(self, path: str, seed: int, world, hashes: bool = True):
+        self.output = open(path, 'wb')
+        self.hashes = hashes
+        self.output.write(RECORDING_MAGIC)
+        self.output.write(struct.pack('<QB', seed, hashes))
+        self.output.write(world_hash(world))
+    
+    def event(self, name: str, *args):
+        code = RECORDED_EVENTS[name]
+        self.output.write(code + struct.pack('<iiii'[:len(args)+1], *map(int, args)))
+    
+    def frame(self, delta_time: float, world):
+        self.output.write(b'F' + struct.pack('<d', delta_time))
+        if self.hashes:
+            self.output.write(world_hash(world))
+    
+    def close(self):
+        self.output.close()
+
+RECORDING_MAGIC = b'C108REC\x01'
+RECORDED_EVENTS = {'on_key_press': b'K', 'on_key_release': b'R',
+                   'on_mouse_press': b'M', 'on_mouse_motion': b'V'}
+RECORDED_SIZES = {b'K': 2, b'R': 2, b'M': 4, b'V': 4}
+
+def read_recording(path: str) -> dict:
+    """
+    Reads a recording made by InputRecorder.
+    
+    Returns:
+        dict: The 'seed', the initial world's 'hash' (bytes), and the
+            'frames', a list of (delta_time, hash, events) tuples where each
+            event is a (name, *args) tuple and hash is None if not recorded.
+    """
+    names = {code: name for name, code in RECORDED_EVENTS.items()}
+    with open(path, 'rb') as recording:
+        data = recording.read()
+    if not data.startswith(RECORDING_MAGIC):
+        raise ValueError("{} is not a recording".format(path))
+    offset = len(RECORDING_MAGIC)
+    seed, hashes = struct.unpack_from('<QB', data, offset)
+    offset += 9
+    initial_hash = data[offset:offset+8]
+    offset += 8
+    frames, events = [], []
+    while offset < len(data):
+        code = data[offset:offset+1]
+        offset += 1
+        if code == b'F':
+            delta_time, = struct.unpack_from('<d', data, offset)
+            offset += 8
+            frame_hash = data[offset:offset+8] if hashes else None
+            offset += 8 if hashes else 0
+            frames.append((delta_time, frame_hash, events))
+            events = []
+        else:
+            size = RECORDED_SIZES[code]
+            args = struct.unpack_from('<'+'i'*size, data, offset)
+            offset += 4*size
+            events.append((names[code],) + args)
+    return {'seed': seed, 'hash': initial_hash, 'frames': frames}
+
+def replay_recording(game, path: str, draw: bool = False,
+                     check_hashes: bool = True) -> dict:
+    """
+    Replays a recording on the game (usually a headless one, with the same
+    initial world as the recording) as fast as possible.
+    
+    Args:
+        game (Cisc108GameUntyped): The game to replay the events on.
+        path (str): The recording made by start_recording.
+        draw (bool): Whether to draw every frame.
+        check_hashes (bool): Whether to compare the world's hash every frame.
+    Returns:
+        dict: The number of 'frames' and 'events', the 'seconds' it took, the
+            'frames per second', and the 'first mismatched frame' (None if
+            every hash matched, or -1 if the initial worlds differed).
+    """
+    recording = read_recording(path)
+    random.seed(recording['seed'])
+    mismatch = None
+    if check_hashes and world_hash(game.world) != recording['hash']:
+        mismatch = -1
+    event_count = 0
+    start = time.perf_counter()
+    for frame, (delta_time, frame_hash, events) in enumerate(recording['frames']):
+        for name, *args in events:
+            getattr(game, name)(*args)
+        event_count += len(events)
+        game.on_update(delta_time)
+        if draw:
+            game.on_draw()
+        game.frame_finished()
+        if (check_hashes and frame_hash is not None and mismatch is None and
+                world_hash(game.world) != frame_hash):
+            mismatch = frame
+    seconds = time.perf_counter() - start
+    frames = len(recording['frames'])
+    return {'frames': frames, 'events': event_count, 'seconds': seconds,
+            'frames per second': frames / seconds if seconds else float('inf'),
+            'first mismatched frame': mismatch}
+
+class FlightRecorder:
+    """
+    Keeps the input of the latest frames, so that it can be saved (with
+    the world it started from) when the game fails. Every `every` frames,
+    a snapshot of the world (see snapshot_world) is taken along with the
+    random state, the time not yet simulated and the saved mouse motions.
+    Only the events since the oldest snapshot that is still needed are
+    kept, so memory does not grow no matter how long the game runs.
+    
+    The saved ".flight" file is a pickled dictionary, with:
+        'game': The name of the game.
+        'reason': Why the game failed (a traceback, or the failed check).
+        'world': The world at the oldest snapshot.
+        'random state', 'time behind', 'motions': The rest of the game at
+            that snapshot.
+        'frames': Every frame since then, as (delta_time, events) tuples,
+            where each event is a (name, *args) tuple.
+        'events': The events after the start of the last frame.
+        'changes': How the world changed between each snapshot and the
+            next (see diff_worlds), or None if the World is not known.
+    
+    Args:
+        label (str): The name to put at the start of the file.
+        World (type): The World type, for describing the changes, or None.
+        frames (int): How many of the latest frames to keep, at least.
+        every (int): How many frames to wait between snapshots.
+        directory (str): Where to write the file.
+    
+    Attributes:
+        segments (deque): A (snapshot, random state, time behind, motions,
+            frames) tuple for each snapshot kept.
+        events (list): The events since the last frame started.
+        dumped (bool): Whether the current failure was already saved.
+    """
+    def __init__(self, label: str, World=None, frames: int = 600,
+                 every: int = 60, directory: str = "."):
+        self.label = label
+        self.World = World
+        self.every = every
+        self.directory = directory
+        self.segments = collections.deque(maxlen=frames // every + 2)
+        self.events = []
+        self.frame_count = 0
+        self.dumped = False
+    
+    def keyframe(self, game):
+        """ Takes a snapshot of the game, which the next frames start from. """
+        previous = self.segments[-1][0] if self.segments else None
+        self.segments.append((game.snapshot(previous),
+                              random.getstate(), game.time_behind,
+                              list(game.motions), []))
+    
+    def event(self, name: str, *args):
+        self.events.append((name,) + args)
+    
+    def frame(self, delta_time: float):
+        self.segments[-1][4].append((delta_time, self.events))
+        self.events = []
+        self.dumped = False
+    
+    def frame_finished(self, game):
+        self.frame_count += 1
+        if self.frame_count % self.every == 0:
+            self.keyframe(game)
+    
+    def changes(self) -> list:
+        """ Produces the patches between each snapshot and the next. """
+        if self.World is None:
+            return None
+        worlds = [restore_snapshot(segment[0]) for segment in self.segments]
+        try:
+            return [diff_worlds(old, new, self.World)
+                    for old, new in zip(worlds, worlds[1:])]
+        except Exception:
+            # The world might no longer match its type, which is fine here
+            return None
+    
+    def dump(self, reason: str) -> str:
+        """
+        Saves the kept frames into a new file, unless this failure was
+        already saved. Saving never raises, so the failure itself is what
+        the player sees.
+        
+        Returns:
+            str: The path of the file, or None if nothing was saved.
+        """
+        if self.dumped:
+            return None
+        self.dumped = True
+        snapshot, random_state, time_behind, motions, frames = self.segments[0]
+        path = os.path.join(self.directory, "{}-{}.flight".format(
+            self.label, time.strftime("%Y%m%d-%H%M%S")))
+        try:
+            flight = {'game': self.label, 'reason': reason,
+                      'world': restore_snapshot(snapshot),
+                      'random state': random_state, 'time behind': time_behind,
+                      'motions': motions,
+                      'frames': [frame for segment in self.segments
+                                 for frame in segment[4]],
+                      'events': list(self.events), 'changes': self.changes()}
+            with open(path, 'wb') as output:
+                pickle.dump(flight, output, pickle.HIGHEST_PROTOCOL)
+        except Exception as error:
+            print("Could not save the flight recorder: {}".format(error))
+            return None
+        print("Saved the last {} frames before the failure into {}".format(
+            len(flight['frames']), path))
+        return path
+
+def read_flight(path: str) -> dict:
+    """ Reads a file saved by FlightRecorder (see it for what is inside). """
+    with open(path, 'rb') as source:
+        return pickle.load(source)
+
+def replay_flight(game, path: str, draw: bool = False) -> dict:
+    """
+    Replays a file saved by the flight recorder on the game (usually a
+    headless one), as fast as possible. The game is put back the way it
+    was at the start of the file, and every frame since is replayed, so
+    the failure should happen again (and raise, as it did the first time).
+    
+    Args:
+        game (Cisc108GameUntyped): The game to replay the frames on.
+        path (str): The file saved by the flight recorder.
+        draw (bool): Whether to draw every frame; needed if the failure
+            happened while drawing.
+    Returns:
+        dict: The number of 'frames' and 'events', the 'seconds' it took,
+            and the 'frames per second', if the failure did not happen again.
+    """
+    flight = read_flight(path)
+    recorder, game.flight = game.flight, None
+    try:
+        game.replace_world(flight['world'])
+        random.setstate(flight['random state'])
+        game.time_behind = flight['time behind']
+        game.motions = list(flight['motions'])
+        event_count = 0
+        start = time.perf_counter()
+        for delta_time, events in flight['frames']:
+            for name, *args in events:
+                getattr(game, name)(*args)
+            event_count += len(events)
+            game.on_update(delta_time)
+            if draw:
+                game.on_draw()
+            game.frame_finished()
+        for name, *args in flight['events']:
+            getattr(game, name)(*args)
+        event_count += len(flight['events'])
+        seconds = time.perf_counter() - start
+    finally:
+        game.flight = recorder
+    frames = len(flight['frames'])
+    return {'frames': frames, 'events': event_count, 'seconds': seconds,
+            'frames per second': frames / seconds if seconds else float('inf')}
+
+class HeadlessRunner:
+    """
+    Drives a headless game (one made with `headless=True`) without a window,
+    as fast as the computer allows. Every frame, the events for that frame
+    are passed to the game, then the world is updated, and then (only if
+    `draw` is True) the world is drawn.
+    
+    Events are tuples like ('on_mouse_motion', x, y, dx, dy), naming the
+    game's method and its arguments. They can be given as a list of
+    (frame, name, *args) tuples sorted by frame, or as a function that
+    consumes the frame number and produces a list of (name, *args) tuples.
+    
+    Args:
+        game (Cisc108GameUntyped): The headless game to drive.
+        events (list or int->list): The events to give the game.
+        draw (bool): Whether to call on_draw every frame.
+        delta_time (float): The time that passes in each frame.
+    
+    Attributes:
+        frame (int): The number of frames run so far.
+        event_count (int): The number of events given to the game so far.
+    """
+    def __init__(self, game, events=None, draw=False, delta_time=GAME_SPEED):
+        self.game = game
+        self.events = [] if events is None else events
+        self.draw = draw
+        self.delta_time = delta_time
+        self.frame = 0
+        self.event_count = 0
+        self.next_event = 0
+    
+    def events_for_frame(self, frame: int) -> list:
+        """ Produces the (name, *args) events that happen in the given frame. """
+        if callable(self.events):
+            return self.events(frame) or []
+        found = []
+        while (self.next_event < len(self.events) and
+               self.events[self.next_event][0] <= frame):
+            found.append(self.events[self.next_event][1:])
+            self.next_event += 1
+        return found
+    
+    def step(self):
+        """ Runs a single frame of the game. """
+        for name, *args in self.events_for_frame(self.frame):
+            getattr(self.game, name)(*args)
+            self.event_count += 1
+        self.game.on_update(self.delta_time)
+        if self.draw:
+            self.game.on_draw()
+        self.game.frame_finished()
+        self.frame += 1
+    
+    def run(self, frames: int) -> dict:
+        """
+        Runs the given number of frames, and reports how fast that was.
+        
+        Args:
+            frames (int): How many frames to run.
+        Returns:
+            dict: The number of 'frames' and 'events', the 'seconds' it took,
+                and the resulting 'frames per second'.
+        """
+        events_before = self.event_count
+        start = time.perf_counter()
+        for frame in range(frames):
+            self.step()
+        seconds = time.perf_counter() - start
+        return {'frames': frames,
+                'events': self.event_count - events_before,
+                'seconds': seconds,
+                'frames per second': frames / seconds if seconds else float('inf')}
+
+def run_headless(World, an_initial_world, draw_world, update_world,
+                 handle_key=None, handle_mouse=None, handle_motion=None,
+                 handle_release=None, frames=1000, events=None, draw=False,
+                 delta_time=GAME_SPEED, **options) -> dict:
+    """
+    Makes a headless game out of the usual World, initial world and
+    functions, and runs it for the given number of frames with a
+    HeadlessRunner. If World is None, the world's type is not checked.
+    Any other options are passed along to the game.
+    
+    Returns:
+        dict: How fast the frames ran (see HeadlessRunner.run).
+    """
+    functions = (an_initial_world, draw_world, update_world,
+                 handle_key, handle_mouse, handle_motion, handle_release)
+    if World is None:
+        game = Cisc108GameUntyped(0, 0, "", *functions, headless=True, **options)
+    else:
+        game = Cisc108Game(World, 0, 0, "", *functions, headless=True, **options)
+    return HeadlessRunner(game, events, draw, delta_time).run(frames)
+
+class ValidateEveryEvent:
+    '''
+    A validation policy that checks the world before and after every event.
+    This is the safest (and slowest) policy, and the default one.
+
+    A validation policy decides when Cisc108Game checks its world. Every
+    policy answers `check_event` (should the world be checked around this
+    event?) and `check_frame` (should the world be checked once, at the
+    end of updating this frame?), and is told how long each frame check
+    took through `checked`. Frame checks happen whether or not the frame
+    is drawn.
+    '''
+    def check_event(self) -> bool:
+        return True
+
+    def check_frame(self) -> bool:
+        return False
+
+    def checked(self, seconds: float):
+        pass
+
+class ValidateEveryFrame(ValidateEveryEvent):
+    ''' Checks the world once per frame, after all the events and updates. '''
+    def check_event(self) -> bool:
+        return False
+
+    def check_frame(self) -> bool:
+        return True
+
+class ValidateEveryNthFrame(ValidateEveryFrame):
+    '''
+    Checks the world once every `frames` frames.
+
+    Args:
+        frames (int): How many frames to wait between checks.
+    '''
+    def __init__(self, frames: int):
+        self.frames = frames
+        self.frames_left = frames
+
+    def check_frame(self) -> bool:
+        self.frames_left -= 1
+        if self.frames_left > 0:
+            return False
+        self.frames_left = self.frames
+        return True
+
+class ValidateWithinBudget(ValidateEveryFrame):
+    '''
+    Spends at most `seconds` per frame (on average) checking the world. Each
+    frame adds `seconds` to the budget and each check takes away however long
+    it took; the world is only checked when the budget is not in debt.
+
+    Args:
+        seconds (float): The time to spend on checks per frame.
+    '''
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.budget = 0.0
+
+    def check_frame(self) -> bool:
+        self.budget = min(self.budget + self.seconds, self.seconds)
+        return self.budget >= 0
+
+    def checked(self, seconds: float):
+        self.budget -= seconds
+
+def _copy_world(world):
+    ''' Makes a deep copy of the world, as quickly as possible. '''
+    try:
+        return pickle.loads(pickle.dumps(world, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return copy.deepcopy(world)
 
 
 class Cisc108Game(Cisc108GameUntyped):
     '''
     A version of the Cisc108Game class that requires stricter typing with the
     World.
+
+    If `incremental` is True, the world is wrapped in change-tracking
+    dictionaries and lists (see WorldChanges), and only the values stored
+    since the last check (and the containers stored into the world from
+    outside, which cannot be tracked) are validated. The entire world is
+    only walked at the start, when a check fails, or when asked for with
+    `full=True`. Skipping unchanged draws (`skip_unchanged_draws`) tracks
+    the world in the same way.
+
+    The `validation` policy decides how often the world is checked (see
+    ValidateEveryEvent, ValidateEveryFrame, ValidateEveryNthFrame and
+    ValidateWithinBudget). When checks are not done around every event and
+    `replay_on_failure` is True, the events since the last successful check
+    are logged; if a check fails, they are replayed on a copy of the world
+    from that check, to find exactly which event broke the world.
     '''
     def __init__(self, World, window_width, window_height, window_caption,
                  an_initial_world, draw_world, update_world,
                  handle_key=None, handle_mouse=None, handle_motion=None,
-                 handle_release=None):
+                 handle_release=None, incremental=False, validation=None,
+                 replay_on_failure=False, **options):
         super().__init__(window_width, window_height, window_caption,
                          an_initial_world, draw_world, update_world,
-                         handle_key, handle_mouse, handle_motion, handle_release)
+                         handle_key, handle_mouse, handle_motion, handle_release,
+                         **options)
         self.World = World
+        self.validate_world = make_type_validator(World)
+        self.world_changes = None
+        self.validation = ValidateEveryEvent() if validation is None else validation
+        self.replay_on_failure = replay_on_failure
+        self.event_log = None
+        self.snapshotted = (None, None)
         self.validate_worlds_type("In the initial world")
+        # Tracking the changes also tells when the world has not changed
+        if incremental or self.skip_unchanged_draws:
+            self.world_changes = WorldChanges(World)
+            self.world = self.world_changes.wrap(self.world, World)
+        self.save_checkpoint()
+    
+    def save(self, path: str):
+        ''' Saves the current world into the file at `path` (see WorldCodec). '''
+        from cisc108_codec import save_world
+        save_world(self.world, self.World, path)
+    
+    def load(self, path: str):
+        ''' Replaces the current world with the one saved at `path`. '''
+        from cisc108_codec import load_world
+        self.replace_world(load_world(self.World, path))
+    
+    def replace_world(self, world):
+        ''' Replaces the current world, checking (and tracking) the new one. '''
+        if self.world_changes is not None:
+            world = self.world_changes.wrap(world, self.World)
+            self.world_changes.version += 1
+        self.world = world
+        self.validate_worlds_type("After replacing the world", full=True)
+    
+    def swap_functions(self, module) -> bool:
+        '''
+        Also switches to the module's World (if it has one), which is
+        compiled into a new validator. The whole world is checked against
+        it first; if the world does not fit, the reason is printed and
+        nothing is swapped, so the game can keep going.
+        
+        Reloading makes new Record classes, which the records already in the
+        world are not instances of. So any Record class with the same name
+        and schema as one in the old World is swapped back for the old one,
+        both in the new World and in the module (so the new functions make
+        records of the old class too). Records whose schema changed do not
+        fit, and keep the old functions.
+        '''
+        old_records = _record_classes(self.World, {})
+        World = _reuse_record_classes(getattr(module, 'World', self.World), old_records)
+        for name, value in list(vars(module).items()):
+            if isinstance(value, type) and issubclass(value, Record):
+                setattr(module, name, _reuse_record_classes(value, old_records))
+        validate_world = make_type_validator(World)
+        reason = validate_world(self.world, "After reloading, world")
+        if reason:
+            print("Kept the old functions, since the world does not fit "
+                  "the new World:\n{}".format(reason))
+            return False
+        self.World, self.validate_world = World, validate_world
+        if self.world_changes is not None:
+            # Tracked containers know their types, so wrap the world again
+            self.world_changes = WorldChanges(World)
+        self.replace_world(self.world)
+        return super().swap_functions(module)
+    
+    def snapshot(self, previous=None):
+        '''
+        Gives back the `previous` snapshot without looking at the world, if
+        the world's changes are all being tracked and its version has not
+        moved since that snapshot was taken.
+        '''
+        changes = self.world_changes
+        if changes is None:
+            return super().snapshot(previous)
+        version, snapshot = self.snapshotted
+        if (previous is not None and previous is snapshot and
+                version == changes.version and changes.sees_everything()):
+            return previous
+        snapshot = super().snapshot(previous)
+        self.snapshotted = (changes.version, snapshot)
+        return snapshot
     
-    def validate_worlds_type(self, when: str):
-        that_world_is_valid = or_give_reason = _validate_type(self.world, self.World, when+", world")
-        that_world_is_valid = not that_world_is_valid
-        if not that_world_is_valid:
+    def world_fingerprint(self):
+        '''
+        Uses the version of the world, if its changes are being tracked,
+        along with a hash of the containers whose changes cannot be tracked
+        (see WorldChanges), if there are any.
+        '''
+        changes = self.world_changes
+        if changes is None:
+            return super().world_fingerprint()
+        if changes.sees_everything():
+            return changes.version
+        untracked = [value for check, value in changes.untracked.values()]
+        return changes.version, world_hash(untracked)
+    
+    def find_world_problem(self, when: str, full: bool = False):
+        '''
+        Checks the current world, producing None if it is fine or else
+        the reason why it is not.
+        '''
+        return self.run_callback('validate_worlds_type', self._find_world_problem,
+                                 when, full)
+    
+    def _find_world_problem(self, when, full):
+        if (not full and self.world_changes is not None and
+                self.world_changes.check()):
+            return None
+        return self.validate_world(self.world, when+", world")
+    
+    def validate_worlds_type(self, when: str, full: bool = False):
+        self.report_world_problem(self.find_world_problem(when, full))
+    
+    def report_world_problem(self, or_give_reason):
+        that_world_is_valid = not or_give_reason
+        if not that_world_is_valid and self.window is not None:
             try:
+                import arcade
                 arcade.close_window()
             except:
                 pass
+        if not that_world_is_valid and self.flight is not None:
+            self.flight.dump(or_give_reason)
         assert that_world_is_valid, or_give_reason
         #if reason:
         #    raise AssertionError(reason)
+    
+    def save_checkpoint(self):
+        ''' Remembers the current world, so the events after it can be replayed. '''
+        if self.replay_on_failure and not self.validation.check_event():
+            self.checkpoint = (_copy_world(self.world), random.getstate(),
+                               self.time_behind, list(self.motions))
+            self.event_log = []
+    
+    def replay_events(self):
+        '''
+        Replays the logged events on a copy of the checkpoint world, checking
+        the world after each one. Produces the reason for the first problem
+        found, or None if the problem could not be reproduced.
+        
+        Only the world is replayed: everything else the frames do (hotkeys,
+        the rewind history, finished work, reloading, the instruments and
+        recorders) is turned off meanwhile, so the replay cannot act on the
+        real game. Games with coroutines are not replayed at all, since
+        their tasks carry on past the events that started them.
+        '''
+        if self.bridge is not None:
+            return None
+        world, random_state, time_behind, motions = self.checkpoint
+        current = self.world, random.getstate(), self.time_behind, self.motions
+        hotkeys, instruments, deliveries = self.hotkeys, self.instruments, self.deliveries
+        turned_off = {name: getattr(self, name) for name in REPLAY_TURNS_OFF}
+        for name in turned_off:
+            setattr(self, name, None)
+        self.hotkeys, self.instruments = {}, []
+        # Work that finishes meanwhile is kept for the real world
+        self.deliveries = collections.deque()
+        self.world = _copy_world(world)
+        random.setstate(random_state)
+        self.time_behind, self.motions = time_behind, list(motions)
+        try:
+            for index, (name, args) in enumerate(self.event_log):
+                if name == 'on_key_press' and args[0] in hotkeys:
+                    continue
+                getattr(Cisc108GameUntyped, name)(self, *args)
+                when = "After {} (event {} of {} since the last check)".format(
+                    name, index+1, len(self.event_log))
+                reason = self.validate_world(self.world, when+", world")
+                if reason:
+                    return reason
+        finally:
+            self.world, random_state, self.time_behind, self.motions = current
+            random.setstate(random_state)
+            for name, value in turned_off.items():
+                setattr(self, name, value)
+            self.hotkeys, self.instruments = hotkeys, instruments
+            self.deliveries = deliveries
+    
+    def validate_frame(self):
+        ''' Checks the world once for this frame, as the policy asked. '''
+        start = time.perf_counter()
+        reason = self.find_world_problem("After on_update")
+        self.validation.checked(time.perf_counter() - start)
+        if reason and self.event_log is not None:
+            reason = self.replay_events() or reason
+        self.report_world_problem(reason)
+        self.save_checkpoint()
+    
+    def checked_event(self, name, handle, *args):
+        ''' Runs the event, checking the world around it if the policy asks. '''
+        if self.validation.check_event():
+            self.validate_worlds_type("Before "+name)
+            handle(*args)
+            self.validate_worlds_type("After "+name)
+        else:
+            if self.event_log is not None:
+                self.event_log.append((name, args))
+            handle(*args)
 
     def on_draw(self):
-        self.validate_worlds_type("Before on_draw")
-        super().on_draw()
-        self.validate_worlds_type("After on_draw")
+        self.checked_event("on_draw", super().on_draw)
     
     def on_update(self, delta_time: float):
-        self.validate_worlds_type("Before on_update")
-        super().on_update(delta_time)
-        self.validate_worlds_type("After on_update")
+        self.checked_event("on_update", super().on_update, delta_time)
+        if self.validation.check_frame():
+            self.validate_frame()
     
     def on_key_press(self, key: int, modifiers: int):
-        self.validate_worlds_type("Before on_key_press")
-        super().on_key_press(key, modifiers)
-        self.validate_worlds_type("After on_key_press")
+        self.checked_event("on_key_press", super().on_key_press, key, modifiers)
     
     def on_key_release(self, key: int, modifiers: int):
-        self.validate_worlds_type("Before on_key_release")
-        super().on_key_release(key, modifiers)
-        self.validate_worlds_type("After on_key_release")
+        self.checked_event("on_key_release", super().on_key_release, key, modifiers)
     
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
-        self.validate_worlds_type("Before on_mouse_press")
-        super().on_mouse_press(x, y, button, modifiers)
-        self.validate_worlds_type("After on_mouse_press")
+        self.checked_event("on_mouse_press", super().on_mouse_press, x, y, button, modifiers)
     
     def on_mouse_motion(self, x: int, y: int, dx: int, dy: int):
-        self.validate_worlds_type("Before on_mouse_motion")
+        if not self.coalesce_motion:
+            self.checked_event("on_mouse_motion", super().on_mouse_motion, x, y, dx, dy)
+            return
+        # The motions are only handled (and checked) during on_update
+        if self.event_log is not None:
+            self.event_log.append(("on_mouse_motion", (x, y, dx, dy)))
         super().on_mouse_motion(x, y, dx, dy)
-        self.validate_worlds_type("After on_mouse_motion")
-
-def assert_type(value, expected_type) -> bool:
-    """
-    Checks that the given value is of the expected_type.
-    
-    Args:
-        value (Any): Any kind of python value. Should have been computed by
-            the students' code (their actual answer).
-        expected_type (type): Any kind of type value. Should be in the format
-            used within CISC108. This includes support for literal composite
-            types (e.g., [int] and {str: int}) and record types.
-    Returns:
-        bool: Whether or not the assertion passed.
-    """
-    # Can we add in the line number and code?
-    line, code = get_line_code()
-    if None in (line, code):
-        context = ""
-    else:
-        context = MESSAGE_LINE_CODE.format(line=line, code=code)
-        #student_tests.lines.append(line)
-    
-    reason = _validate_type(value, expected_type, "value")
-    # TODO
-    #student_tests.tests += 1
-    if reason is not None:
-        #student_tests.failures += 1
-        if isinstance(expected_type, dict):
-            if isinstance(value, dict):
-                reason = "the "+reason
-            else:
-                reason = "the "+reason
-        print("FAILURE{context},".format(context=context), reason)
-        return False
-    elif not QUIET:
-        print(MESSAGE_GENERIC_SUCCESS.format(context=context))
-    #student_tests.successes += 1
-    return True
-
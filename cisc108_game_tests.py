@@ -0,0 +1,407 @@
+from cisc108 import assert_equal
+from cisc108_game import *
+import asyncio, copy, os, random, shutil, tempfile, time, types
+
+__VERSION__ = '0.0.1'
+
+World = {'n': int, 'keys': [int]}
+
+def make_test_world():
+    return {'n': 0, 'keys': []}
+
+def draw_nothing(world):
+    pass
+
+def count_up(world):
+    world['n'] += 1
+
+def break_on_key(world, key):
+    if key == 9:
+        key = 'nine'
+    world['keys'].append(key)
+
+def make_headless_game(**options):
+    return Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, count_up,
+                       handle_key=break_on_key, headless=True, **options)
+
+def find_failure(game, events, frames):
+    ''' Runs the frames without drawing, producing the failed check (or None). '''
+    try:
+        HeadlessRunner(game, events, draw=False).run(frames)
+    except AssertionError as failure:
+        return str(failure)
+    return None
+
+################################################################################
+## Testing the frame checks, without drawing
+# Every policy notices the broken world, even though no frame is drawn
+for policy in [ValidateEveryEvent(), ValidateEveryFrame(),
+               ValidateEveryNthFrame(3), ValidateWithinBudget(1.0)]:
+    game = make_headless_game(validation=policy)
+    reason = find_failure(game, [(2, 'on_key_press', 9, 0)], 10)
+    assert_equal(reason is not None and "world['keys']" in reason, True)
+
+# Replaying finds the event that broke the world
+game = make_headless_game(validation=ValidateEveryNthFrame(5), replay_on_failure=True)
+events = [(0, 'on_key_press', 1, 0), (1, 'on_key_press', 9, 0), (1, 'on_key_press', 2, 0)]
+reason = find_failure(game, events, 10)
+assert_equal(reason.startswith("After on_key_press (event 3 of"), True)
+
+# Replaying does not press the hotkeys again, or add to the rewind history
+game = make_headless_game(validation=ValidateEveryNthFrame(5), replay_on_failure=True)
+game.enable_rewind()
+presses = []
+game.hotkeys[60] = lambda: presses.append(len(presses))
+events = [(1, 'on_key_press', 60, 0), (3, 'on_key_press', 9, 0)]
+reason = find_failure(game, events, 10)
+assert_equal(reason.startswith("After on_key_press (event"), True)
+assert_equal(presses, [0])
+assert_equal([restore_snapshot(snapshot)['n'] for snapshot in game.history],
+             [0, 1, 2, 3, 4, 5])
+
+# The events since the last check are forgotten once the check passes
+game = make_headless_game(validation=ValidateEveryFrame(), replay_on_failure=True,
+                          incremental=True)
+HeadlessRunner(game, [(frame, 'on_key_press', 1, 0) for frame in range(100)]).run(100)
+assert_equal(game.world['n'], 100)
+assert_equal(len(game.event_log), 0)
+assert_equal(len(game.world_changes.pending), 0)
+
+################################################################################
+## Testing diff_worlds and apply_patch
+Dot = make_record_class('Dot', {'x': int, 'y': float})
+Scene = {'values': [float], 'flag': int, 'names': {str: int}, 'dots': [Dot]}
+
+def make_scene():
+    return {'values': [1.0, 2.0, 3.0], 'flag': 1, 'names': {'ada': 1},
+            'dots': [Dot(1, 2.0)]}
+
+def round_trip(new):
+    ''' Patches a fresh scene into the new one, producing whether it worked. '''
+    patch = diff_worlds(make_scene(), new, Scene)
+    patched = apply_patch(make_scene(), patch)
+    return world_hash(patched) == world_hash(new) and patched == new
+
+scene = make_scene()
+assert_equal(diff_worlds(make_scene(), scene, Scene), [])
+# Values that are equal but of a different type still make it into the patch
+scene['values'][0] = 1
+assert_equal(round_trip(scene), True)
+scene = make_scene()
+scene['values'][2] = 3
+assert_equal(round_trip(scene), True)
+scene = make_scene()
+scene['flag'] = True
+assert_equal(diff_worlds(make_scene(), scene, Scene), [('set', "world['flag']", True)])
+assert_equal(round_trip(scene), True)
+# Inserting into and removing from lists
+scene = make_scene()
+scene['values'].insert(1, 1.5)
+scene['values'].append(4.0)
+assert_equal(round_trip(scene), True)
+scene = make_scene()
+del scene['values'][0:2]
+assert_equal(round_trip(scene), True)
+# Adding and deleting keys
+scene = make_scene()
+del scene['names']['ada']
+scene['names']['grace'] = 2
+assert_equal(round_trip(scene), True)
+# Changing records
+scene = make_scene()
+scene['dots'][0].y = 2
+scene['dots'].append(Dot(3, 4.0))
+assert_equal(round_trip(scene), True)
+
+################################################################################
+## Testing swap_functions with Record classes
+def make_module(source):
+    ''' Runs the source as a fresh module, like reloading a game's file does. '''
+    module = types.ModuleType('reloaded')
+    exec("from cisc108_game import *\n" + source, module.__dict__)
+    return module
+
+Pos = make_record_class('Pos', {'x': int, 'y': int})
+PosWorld = {'at': Pos, 'trail': [Pos]}
+
+def move_right(world):
+    world['at'].x += 1
+
+game = Cisc108Game(PosWorld, 0, 0, "", lambda: {'at': Pos(0, 0), 'trail': []},
+                   draw_nothing, move_right, headless=True)
+# The reloaded Pos is a new class, but is swapped back for the old one
+module = make_module("""
+Pos = make_record_class('Pos', {'x': int, 'y': int})
+World = {'at': Pos, 'trail': [Pos]}
+def move_right(world):
+    world['trail'].append(Pos(world['at'].x, world['at'].y))
+    world['at'].x += 2
+""")
+assert_equal(game.swap_functions(module), True)
+assert_equal(module.Pos is Pos, True)
+assert_equal(game.World['at'] is Pos, True)
+game.update_world(game.world)
+assert_equal(game.world, {'at': Pos(2, 0), 'trail': [Pos(0, 0)]})
+assert_equal(game.validate_world(game.world, "world"), None)
+# A Pos with different fields does not fit the world, so nothing is swapped
+module = make_module("""
+Pos = make_record_class('Pos', {'x': int, 'y': int, 'z': int})
+World = {'at': Pos, 'trail': [Pos]}
+def move_right(world):
+    world['at'].z += 1
+""")
+assert_equal(game.swap_functions(module), False)
+assert_equal(game.World['at'] is Pos, True)
+
+################################################################################
+## Testing coroutine functions
+started = []
+
+async def slow_update(world):
+    started.append(world['n'])
+    await asyncio.sleep(0.05)
+    world['n'] += 1
+
+game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, slow_update,
+                   headless=True)
+game.enable_async()
+# A slow update_world is not started again while it is still running
+HeadlessRunner(game, [], draw=False).run(10)
+assert_equal(started, [0])
+# Once it finishes (a few steps of the loop after its sleep), it starts again
+time.sleep(0.1)
+HeadlessRunner(game, [], draw=False).run(5)
+assert_equal(game.world['n'], 1)
+assert_equal(started, [0, 1])
+game.bridge.close()
+
+################################################################################
+## Testing AllocationTracker
+def allocate_briefly(world):
+    world['n'] += len(bytearray(5000000)) // 5000000
+
+game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, allocate_briefly,
+                   headless=True)
+tracker = game.enable_allocation_tracking()
+HeadlessRunner(game, [], draw=False).run(2)
+tracker.stop_tracking()
+assert_equal(game.world['n'], 2)
+assert_equal(tracker.calls['update_world'], 2)
+assert_equal(tracker.allocated['update_world'][2] >= 5000000, True)
+# The peak inside update_world is part of the peak of the frame around it
+assert_equal(tracker.allocated['on_update'][2] >= 5000000, True)
+assert_equal(tracker.peaks, [])
+
+################################################################################
+## Testing InputRecorder, read_recording and replay_recording
+def count_randomly(world):
+    world['n'] += random.randrange(10)
+
+def make_random_game(update=count_randomly):
+    return Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, update,
+                       handle_key=break_on_key, headless=True)
+
+folder = tempfile.mkdtemp()
+path = os.path.join(folder, "game.rec")
+game = make_random_game()
+game.start_recording(path, seed=108)
+events = [(0, 'on_key_press', 1, 0), (0, 'on_key_release', 1, 0),
+          (2, 'on_mouse_press', 10, 20, 1, 0), (4, 'on_key_press', 2, 0)]
+HeadlessRunner(game, events).run(5)
+game.stop_recording()
+final_world = game.world
+# Each event is a code and 4-byte fields; each frame is a code, a double and a hash
+assert_equal(os.path.getsize(path),
+             len(RECORDING_MAGIC) + 9 + 8 + 3*(1+8) + 1*(1+16) + 5*(1+8+8))
+recording = read_recording(path)
+assert_equal(recording['seed'], 108)
+assert_equal(recording['hash'], world_hash(make_test_world()))
+assert_equal([events for delta_time, frame_hash, events in recording['frames']],
+             [[('on_key_press', 1, 0), ('on_key_release', 1, 0)], [],
+              [('on_mouse_press', 10, 20, 1, 0)], [], [('on_key_press', 2, 0)]])
+assert_equal(recording['frames'][-1][1], world_hash(final_world))
+# Replaying the recording gives back the same worlds, random numbers and all
+game = make_random_game()
+report = replay_recording(game, path)
+assert_equal(report['frames'], 5)
+assert_equal(report['events'], 4)
+assert_equal(report['first mismatched frame'], None)
+assert_equal(game.world, final_world)
+# A game that behaves differently is caught on the first frame that differs
+def count_differently(world):
+    world['n'] += random.randrange(10) + (len(world['keys']) > 1)
+
+report = replay_recording(make_random_game(count_differently), path)
+assert_equal(report['first mismatched frame'], 4)
+game = make_random_game()
+game.world['n'] = 5
+assert_equal(replay_recording(game, path)['first mismatched frame'], -1)
+# Anything else is not a recording
+with open(path, 'wb') as recording:
+    recording.write(b'not a recording')
+try:
+    read_recording(path)
+    assert_equal("the file was noticed not to be a recording", True)
+except ValueError:
+    pass
+shutil.rmtree(folder)
+
+################################################################################
+## Testing snapshot_world and restore_snapshot
+world = {'n': 1, 'keys': [1, 2], 'dot': Dot(1, 2.0), 'names': {'ada': [3]}}
+snapshot = snapshot_world(world)
+restored = restore_snapshot(snapshot)
+assert_equal(restored, world)
+assert_equal(restored['keys'] is world['keys'], False)
+assert_equal(type(restored['dot']) is Dot, True)
+# Nothing changed, so the previous snapshot is the snapshot
+assert_equal(snapshot_world(world, snapshot) is snapshot, True)
+# Only what changed is copied again; the rest is shared
+world['names']['ada'].append(4)
+changed = snapshot_world(world, snapshot)
+assert_equal(changed is snapshot, False)
+assert_equal(dict(changed)['keys'] is dict(snapshot)['keys'], True)
+assert_equal(dict(changed)['dot'] is dict(snapshot)['dot'], True)
+assert_equal(restore_snapshot(changed)['names'], {'ada': [3, 4]})
+assert_equal(restore_snapshot(snapshot)['names'], {'ada': [3]})
+# Changing only the type of a value is still a change
+world['n'] = True
+assert_equal(type(restore_snapshot(snapshot_world(world, changed))['n']), bool)
+
+################################################################################
+## Testing rewind and undo
+def add_key(world, key):
+    world['keys'].append(key)
+
+for incremental in [False, True]:
+    game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, count_up,
+                       headless=True, incremental=incremental)
+    game.enable_rewind(frames=4)
+    HeadlessRunner(game, []).run(6)
+    # Only the latest frames are kept
+    assert_equal(len(game.history), 4)
+    game.rewind(2)
+    assert_equal(game.world['n'], 4)
+    game.rewind(100)
+    assert_equal(game.world['n'], 3)
+    # Undoing skips over the frames where nothing changed
+    game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, draw_nothing,
+                       handle_key=add_key, headless=True, incremental=incremental)
+    game.enable_rewind(undo_key=0)
+    HeadlessRunner(game, [(1, 'on_key_press', 5, 0), (3, 'on_key_press', 6, 0)]).run(6)
+    assert_equal(game.world['keys'], [5, 6])
+    game.on_key_press(0, 0)
+    assert_equal(game.world['keys'], [5])
+    # The frames after the second key press are gone, but not the ones before
+    assert_equal(len(game.history), 4)
+    game.undo()
+    assert_equal(game.world['keys'], [])
+    game.undo()
+    assert_equal(game.world['keys'], [])
+
+################################################################################
+## Testing FlightRecorder and replay_flight
+def crash_on_seven(world, key):
+    world['keys'].append(key)
+    if key == 7:
+        raise ZeroDivisionError("seven")
+
+def make_crashing_game():
+    return Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, count_randomly,
+                       handle_key=crash_on_seven, headless=True)
+
+def crash(game, runner, frames):
+    ''' Runs the frames until the game crashes, producing the exception. '''
+    try:
+        runner.run(frames)
+    except ZeroDivisionError as error:
+        return error
+    return None
+
+folder = tempfile.mkdtemp()
+game = make_crashing_game()
+flight = game.enable_flight_recorder(frames=20, every=5, directory=folder)
+runner = HeadlessRunner(game, [(frame, 'on_key_press', frame % 5, 0) for frame in range(47)] +
+                              [(47, 'on_key_press', 7, 0)])
+assert_equal(str(crash(game, runner, 100)), "seven")
+assert_equal(runner.frame, 47)
+crashed_world = copy.deepcopy(game.world)
+paths = os.listdir(folder)
+assert_equal(len(paths), 1)
+path = os.path.join(folder, paths[0])
+# Only the segments needed for the latest 20 frames are kept, so the file
+# starts from the snapshot taken after the first 20 frames
+saved = read_flight(path)
+assert_equal(len(flight.segments), 20 // 5 + 2)
+assert_equal(len(saved['frames']), 47 - 20)
+assert_equal(saved['events'], [('on_key_press', 7, 0)])
+assert_equal("ZeroDivisionError: seven" in saved['reason'], True)
+assert_equal(len(saved['changes']), 20 // 5 + 1)
+# The same failure is only saved once
+assert_equal(flight.dump("again"), None)
+# Replaying the file fails the same way, leaving the same world
+game = make_crashing_game()
+try:
+    replay_flight(game, path)
+    assert_equal("the failure happened again", True)
+except ZeroDivisionError as error:
+    assert_equal(str(error), "seven")
+assert_equal(game.world, crashed_world)
+assert_equal(os.listdir(folder), paths)
+shutil.rmtree(folder)
+
+################################################################################
+## Testing fixed simulation steps
+alphas = []
+
+def draw_between(world, alpha):
+    alphas.append(alpha)
+
+def make_stepped_game(**options):
+    return Cisc108Game(World, 0, 0, "", make_test_world, draw_between, count_up,
+                       headless=True, simulation_step=0.125, **options)
+
+# 2.5 steps pass in each frame, so the updates go 2, 3, 2, 3...
+game = make_stepped_game(interpolate=True)
+runner = HeadlessRunner(game, [], draw=True, delta_time=0.3125)
+runner.step()
+assert_equal(game.world['n'], 2)
+assert_equal(game.time_behind, 0.0625)
+runner.step()
+assert_equal(game.world['n'], 5)
+assert_equal(game.time_behind, 0.0)
+runner.run(2)
+assert_equal(game.world['n'], 10)
+# Drawing is told how far the simulation is towards its next update
+assert_equal(alphas, [0.5, 0.0, 0.5, 0.0])
+# Too far behind, the simulation gives up on catching up
+game = make_stepped_game(max_catch_up=3)
+HeadlessRunner(game, [], delta_time=1.0625).run(1)
+assert_equal(game.world['n'], 3)
+assert_equal(game.time_behind, 0.0625)
+
+################################################################################
+## Testing coalesced mouse motion
+def follow_mouse(world, x, y):
+    world['keys'].append(x)
+
+def follow_all(world, motions):
+    world['keys'].extend(motion['x'] + motion['y'] for motion in motions)
+
+motions = [(0, 'on_mouse_motion', 1, 10, 1, 1), (0, 'on_mouse_motion', 2, 20, 1, 1),
+           (1, 'on_mouse_motion', 3, 30, 1, 1)]
+game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, draw_nothing,
+                   handle_motion=follow_mouse, headless=True)
+HeadlessRunner(game, motions).run(3)
+assert_equal(game.world['keys'], [1, 2, 3])
+# Only the latest position of each frame is given
+game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, draw_nothing,
+                   handle_motion=follow_mouse, headless=True, coalesce_motion='latest')
+HeadlessRunner(game, motions).run(3)
+assert_equal(game.world['keys'], [2, 3])
+# Or every position of each frame, all at once
+game = Cisc108Game(World, 0, 0, "", make_test_world, draw_nothing, draw_nothing,
+                   handle_motion=follow_all, headless=True, coalesce_motion='all')
+HeadlessRunner(game, motions).run(3)
+assert_equal(game.world['keys'], [11, 22, 33])
+assert_equal(game.motions, [])
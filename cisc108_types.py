@@ -0,0 +1,706 @@
+"""
+This file contains the tools for checking the types of values (like the
+World) in CISC108 games and tests. It does not need arcade, so tests can
+import it quickly.
+
+You do not need to open or read this file. It must
+be in the same folder as your other files.
+
+Change Log:
+  - 0.0.4: Record keys like 'items' no longer hide the methods of records
+  - 0.0.3: Containers stored into a tracked world are no longer copied
+  - 0.0.2: Added Record classes, made from Record types with make_record_class
+  - 0.0.1: Moved out of cisc108_game.py (version 0.0.16)
+"""
+
+__version__ = '0.0.4'
+
+import collections.abc, keyword, re, sys
+
+# Better tools for detecting issues in students' code
+from cisc108.assertions import (get_line_code, QUIET,
+                                MESSAGE_LINE_CODE, MESSAGE_GENERIC_SUCCESS)
+
+BETTER_TYPE_NAMES = {
+    str: 'string',
+    int: 'integer',
+    float: 'float',
+    bool: 'boolean',
+    dict: 'dictionary',
+    list: 'list'
+    }
+
+def get_name(value):
+    try:
+        return BETTER_TYPE_NAMES.get(value, value.__name__)
+    except Exception:
+        return str(value)[8:-2]
+    
+def make_key_list(values):
+    if not values:
+        return "and there were no keys at all"
+    elif len(values) == 1:
+        return "but there was the key {!r}".format(values[0])
+    else:
+        return "but there were the keys "+ (", ".join(map(repr, values[:-1]))) + " and {!r}".format(values[-1])
+
+WRONG_TYPE_MESSAGE = " was the wrong type. Expected type was {y_type!r}, but actual value was {x} ({x_type!r})."
+WRONG_KEY_TYPE_MESSAGE = " had a wrong type for a key. Expected type of all keys was {y_type!r}, but there was the key {x} ({x_type!r})."
+MISSING_KEY_MESSAGE = " was missing the key {!r}, {}."
+EXTRA_KEYS_MESSAGE = " had all the correct keys ({}), but also had these unexpected keys: {}"
+
+
+class Record(collections.abc.MutableMapping):
+    '''
+    The base of the classes made by make_record_class. A record keeps each
+    field of its schema in a slot (an attribute) instead of in a dictionary,
+    which takes much less memory, but can still be used like a dictionary:
+    `dot['current']` and `dot.current` are the same field. Records are equal
+    to dictionaries with the same keys and values.
+
+    Records always have exactly the keys of their schema, so fields can be
+    changed but not added or deleted.
+    '''
+    __slots__ = ()
+    # These are filled in by make_record_class
+    _schema = {}
+    _fields = {}
+    _keys = {}
+    _record = None
+
+    def __delitem__(self, key):
+        raise TypeError("Cannot delete the key {!r} from a {}, since it must "
+                        "always have all of its keys".format(key, self._record.__name__))
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __reduce_ex__(self, protocol):
+        return (self._record, tuple(getattr(self, name) for name in self._fields.values()))
+
+    def __repr__(self):
+        return "{}({!r})".format(self._record.__name__, dict(self.items()))
+
+    @classmethod
+    def from_dict(cls, value):
+        '''
+        Makes a record out of a dictionary with the same keys. Any fields
+        that are (lists or dictionaries of) records are made into records
+        too.
+        '''
+        return _make_records(value, cls)
+
+def _make_records(value, expected_type):
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        if isinstance(value, dict):
+            return expected_type(*[_make_records(value[key], expected_type._schema[key])
+                                   for key in expected_type._fields])
+    elif isinstance(expected_type, list) and expected_type and isinstance(value, list):
+        return [_make_records(element, expected_type[0]) for element in value]
+    elif isinstance(expected_type, dict) and isinstance(value, dict):
+        fields, lookup = _split_dictionary_type(expected_type)
+        return {key: _make_records(child, fields.get(key, lookup[1] if lookup else None))
+                for key, child in value.items()}
+    return value
+
+def _split_dictionary_type(expected_type):
+    ''' Produces the field types and the Lookup key/value types (if any). '''
+    if isinstance(expected_type, type) and issubclass(expected_type, Record):
+        return expected_type._schema, None
+    fields, lookup = {}, None
+    for expected_key, expected_value in expected_type.items():
+        if isinstance(expected_key, str):
+            fields[expected_key] = expected_value
+        elif isinstance(expected_key, type):
+            lookup = (expected_key, expected_value)
+            break
+    return fields, lookup
+
+def make_record_class(name: str, schema: dict) -> type:
+    '''
+    Generates a Record class for the given Record type (a dictionary with
+    string keys, like Position = {'x': int, 'y': int}). Keys are turned into
+    attribute names by replacing anything but letters, digits and
+    underscores with underscores, so 'red dots' becomes `red_dots`. Names
+    that records already use (like `items`, `get` or `keys`) get an
+    underscore at the end, so 'items' becomes `items_`.
+
+    The class can be used in a World type in place of the dictionary type.
+    Checking it is quicker than checking a dictionary, since a record
+    always has exactly the right keys. Reading a field as an attribute
+    (`dot.current`) is quicker than from a dictionary, but reading it like
+    a dictionary (`dot['current']`) is a little slower.
+
+    Args:
+        name (str): The name of the class, like 'Position'.
+        schema (dict): The Record type, with only string keys.
+    Returns:
+        type: The new class, which makes records from each field's value
+            (in the order of the schema), or from a dictionary (from_dict).
+    '''
+    fields = {}
+    for key in schema:
+        if not isinstance(key, str):
+            raise TypeError("Records can only have string keys, but {} had the key {!r}".format(name, key))
+        attribute = re.sub(r'\W', '_', key)
+        if not attribute or attribute[0].isdigit() or keyword.iskeyword(attribute):
+            attribute = '_' + attribute
+        if (hasattr(Record, attribute) or hasattr(_TrackedRecord, attribute) or
+                attribute in _TRACKING_SLOTS):
+            attribute += '_'
+        if attribute in fields.values():
+            raise ValueError("The keys of {} would share the attribute name {!r}".format(name, attribute))
+        fields[key] = attribute
+    attributes = list(fields.values())
+    lines = ["def __init__(self, {}):".format(", ".join(attributes))]
+    lines += ["    self.{0} = {0}".format(attribute) for attribute in attributes] or ["    pass"]
+    lines.append("def __getitem__(self, key):")
+    lines += ["    if key == {!r}: return self.{}".format(key, attribute)
+              for key, attribute in fields.items()]
+    lines.append("    raise KeyError(key)")
+    lines.append("def __setitem__(self, key, value):")
+    lines += ["    if key == {!r}: self.{} = value; return".format(key, attribute)
+              for key, attribute in fields.items()]
+    lines.append("    raise KeyError(key)")
+    namespace = {}
+    exec(compile("\n".join(lines), "<record {}>".format(name), "exec"), namespace)
+    record_class = type(name, (Record,), {
+        '__slots__': tuple(attributes),
+        '__init__': namespace['__init__'],
+        '__getitem__': namespace['__getitem__'],
+        '__setitem__': namespace['__setitem__'],
+        '_schema': dict(schema),
+        '_fields': fields,
+        '_keys': {attribute: key for key, attribute in fields.items()},
+    })
+    record_class._record = record_class
+    # So that records can be pickled, as long as the class is saved under its name
+    record_class.__module__ = sys._getframe(1).f_globals.get('__name__', __name__)
+    return record_class
+
+class _TrackedRecord:
+    ''' Makes a Record report changes to its fields to its WorldChanges. '''
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        if name in self._keys:
+            value = self._changes.stored(self, self._keys[name], value)
+        object.__setattr__(self, name, value)
+
+# The slots that tracked records (and lists and dictionaries) add
+_TRACKING_SLOTS = ('_changes', '_type')
+
+_TRACKED_RECORDS = {}
+
+def _tracked_record_class(record_class):
+    ''' Produces (and remembers) the tracked version of a Record class. '''
+    try:
+        return _TRACKED_RECORDS[record_class]
+    except KeyError:
+        tracked = type(record_class.__name__, (_TrackedRecord, record_class),
+                       {'__slots__': _TRACKING_SLOTS,
+                        '__module__': record_class.__module__})
+        _TRACKED_RECORDS[record_class] = tracked
+        return tracked
+
+
+def _validate_dictionary_type(value, expected_type, path):
+    if not isinstance(value, dict):
+        return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type="dictionary")
+    for expected_key, expected_value in expected_type.items():
+        if isinstance(expected_key, str):
+            if expected_key not in value:
+                return path + MISSING_KEY_MESSAGE.format(expected_key, make_key_list(list(value.keys())))
+            reason = _validate_type(value[expected_key], expected_value,
+                                    path+"[{!r}]".format(expected_key))
+            if reason:
+                return reason
+        elif isinstance(expected_key, type):
+            for k, v in value.items():
+                new_path = path+"[{!r}]".format(k)
+                if not isinstance(k, expected_key):
+                    return path + WRONG_KEY_TYPE_MESSAGE.format(x=repr(k), x_type=get_name(type(k)), y_type=get_name(expected_key))
+                reason = _validate_type(v, expected_value, new_path)
+                if reason:
+                    return reason
+            break # only support one key/value type in Lookup style
+    else:
+        if len(expected_type) != len(value):
+            unexpected_keys = set(value.keys()) - set(expected_type.keys())
+            unexpected_keys = ", ".join(map(repr, unexpected_keys))
+            expected_keys = ", ".join(map(repr, expected_type))
+            return path + EXTRA_KEYS_MESSAGE.format(expected_keys, unexpected_keys)
+
+def _validate_type(value, expected_type, path="world"):
+    if isinstance(expected_type, dict):
+        return _validate_dictionary_type(value, expected_type, path)
+    elif isinstance(expected_type, list):
+        if not isinstance(value, list):
+            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type="list")
+        if not expected_type and value:
+            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type="empty list")
+        for index, element in enumerate(value):
+            reason = _validate_type(element, expected_type[0], path+"[{}]".format(index))
+            if reason:
+                return reason
+    elif isinstance(expected_type, type) and issubclass(expected_type, Record):
+        if not isinstance(value, expected_type):
+            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type=get_name(expected_type))
+        for key, attribute in expected_type._fields.items():
+            reason = _validate_type(getattr(value, attribute), expected_type._schema[key],
+                                    path+"[{!r}]".format(key))
+            if reason:
+                return reason
+    elif expected_type == float:
+        if not isinstance(value, (int, float)) and value is not None:
+            return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type=get_name(expected_type))
+    elif not isinstance(value, expected_type) and value is not None:
+        return path + WRONG_TYPE_MESSAGE.format(x=repr(value), x_type=get_name(type(value)), y_type=get_name(expected_type))
+
+# Loops nested deeper than this are moved into their own generated function,
+# since Python refuses to compile too many statically nested blocks.
+MAX_INLINED_LOOPS = 12
+
+def _write_type_check(expected_type, variable, lines, indent, namespace, loops):
+    '''
+    Writes the lines of Python source code that check whether `variable`
+    matches the expected_type. The generated code follows the same rules as
+    _validate_type, but only does `return False` when the check fails.
+    '''
+    pad = "    " * indent
+    def fresh(prefix):
+        name = "{}{}".format(prefix, len(namespace))
+        namespace[name] = None
+        return name
+    def constant(value):
+        name = fresh("t")
+        namespace[name] = value
+        return name
+    if isinstance(expected_type, dict):
+        lines.append(pad+"if not isinstance({}, dict): return False".format(variable))
+        for expected_key, expected_value in expected_type.items():
+            if isinstance(expected_key, str):
+                child = fresh("v")
+                lines.append(pad+"if {!r} not in {}: return False".format(expected_key, variable))
+                lines.append(pad+"{} = {}[{!r}]".format(child, variable, expected_key))
+                _write_type_check(expected_value, child, lines, indent, namespace, loops)
+            elif isinstance(expected_key, type):
+                key, child = fresh("k"), fresh("v")
+                if loops >= MAX_INLINED_LOOPS:
+                    check = constant(_compile_type_check({expected_key: expected_value}))
+                    lines.append(pad+"if not {}({}): return False".format(check, variable))
+                    return
+                lines.append(pad+"for {}, {} in {}.items():".format(key, child, variable))
+                lines.append(pad+"    if not isinstance({}, {}): return False".format(key, constant(expected_key)))
+                _write_type_check(expected_value, child, lines, indent+1, namespace, loops+1)
+                return # only support one key/value type in Lookup style
+        lines.append(pad+"if len({}) != {}: return False".format(variable, len(expected_type)))
+    elif isinstance(expected_type, list):
+        lines.append(pad+"if not isinstance({}, list): return False".format(variable))
+        if not expected_type:
+            lines.append(pad+"if {}: return False".format(variable))
+        elif loops >= MAX_INLINED_LOOPS:
+            check = constant(_compile_type_check(expected_type))
+            lines.append(pad+"if not {}({}): return False".format(check, variable))
+        else:
+            element = fresh("v")
+            lines.append(pad+"for {} in {}:".format(element, variable))
+            _write_type_check(expected_type[0], element, lines, indent+1, namespace, loops+1)
+    elif isinstance(expected_type, type) and issubclass(expected_type, Record):
+        # Records always have exactly their keys, so only the fields are checked
+        lines.append(pad+"if not isinstance({}, {}): return False".format(variable, constant(expected_type)))
+        for key, attribute in expected_type._fields.items():
+            child = fresh("v")
+            lines.append(pad+"{} = {}.{}".format(child, variable, attribute))
+            _write_type_check(expected_type._schema[key], child, lines, indent, namespace, loops)
+    elif expected_type == float:
+        lines.append(pad+"if not isinstance({}, (int, float)) and {} is not None: return False".format(variable, variable))
+    elif isinstance(expected_type, type):
+        lines.append(pad+"if not isinstance({}, {}) and {} is not None: return False".format(variable, constant(expected_type), variable))
+    else:
+        # Anything unusual is left to the slow path, which knows how to explain it
+        lines.append(pad+"if _validate_type({}, {}, ''): return False".format(variable, constant(expected_type)))
+
+def _compile_type_check(expected_type):
+    '''
+    Generates a flat function that consumes a value and produces whether or
+    not it matches the expected_type. No paths or messages are built.
+    '''
+    namespace = {'_validate_type': _validate_type}
+    lines = ["def check(v):"]
+    _write_type_check(expected_type, "v", lines, 1, namespace, 0)
+    lines.append("    return True")
+    exec(compile("\n".join(lines), "<validator>", "exec"), namespace)
+    return namespace['check']
+
+def _schema_key(expected_type):
+    ''' Produces a hashable version of the expected_type, for caching. '''
+    if isinstance(expected_type, dict):
+        return (dict, tuple((k, _schema_key(v)) for k, v in expected_type.items()))
+    elif isinstance(expected_type, list):
+        return (list, tuple(map(_schema_key, expected_type)))
+    return expected_type
+
+_TYPE_CHECKS = {}
+
+def _get_type_check(expected_type):
+    '''
+    Produces the compiled check for the expected_type, reusing an earlier
+    one if the same type has already been compiled.
+    '''
+    try:
+        key = _schema_key(expected_type)
+        return _TYPE_CHECKS[key]
+    except TypeError:
+        return _compile_type_check(expected_type)
+    except KeyError:
+        check = _TYPE_CHECKS[key] = _compile_type_check(expected_type)
+        return check
+
+def make_type_validator(expected_type):
+    '''
+    Compiles the expected_type into a validator function, which behaves like
+    _validate_type: it consumes a value and a path, and produces either None
+    (if the value is fine) or a reason why it was not. Compiled checks
+    are cached, so it is cheap to ask for the same type again.
+
+    Args:
+        expected_type (type): Any kind of type value, in the CISC108 format.
+    Returns:
+        (Any, str->str): The validator function.
+    '''
+    check = _get_type_check(expected_type)
+    def validate(value, path="world"):
+        if check(value):
+            return None
+        # Only explain the problem once we know there is one
+        return _validate_type(value, expected_type, path)
+    return validate
+
+
+def _reference_counts(entries):
+    ''' Counts the references to the value of each (check, value) entry. '''
+    return [sys.getrefcount(entry[1]) for entry in entries]
+
+# The count for a value that nothing but its entry refers to
+_UNUSED_REFERENCES = _reference_counts([(None, [])])[0]
+
+class WorldChanges:
+    '''
+    Wraps a world in change-tracking dictionaries, lists and records, and
+    remembers every value stored into them. Checking the world again then
+    only needs to look at those values, instead of walking the entire world.
+
+    The world is wrapped once, when the game starts (or replaces it); a
+    container found twice in it becomes one tracked container, so the two
+    places still share it. Containers stored into the world after that are
+    kept exactly as they are, so changing them through any other name still
+    changes the world. Those changes cannot be seen, though, so untracked
+    containers are checked in full at every check, until nothing but this
+    object refers to them any more.
+
+    Args:
+        World (dict): The type of the world being tracked.
+    Attributes:
+        pending (list): The (check, value) pairs to look at next time.
+        untracked (dict): The (check, value) pairs of the containers stored
+            into the world from outside, by the id of the container.
+        version (int): Goes up by one every time the world changes (through
+            a tracked container).
+    '''
+    def __init__(self, World):
+        self.World = World
+        self.pending = []
+        self.untracked = {}
+        self.layouts = {}
+        self.version = 0
+
+    def layout(self, expected_type):
+        '''
+        Produces the field types and the Lookup key/value types (if any)
+        of the given dictionary type (or Record class).
+        '''
+        try:
+            return self.layouts[id(expected_type)]
+        except KeyError:
+            layout = self.layouts[id(expected_type)] = _split_dictionary_type(expected_type)
+            return layout
+
+    def wrap(self, value, expected_type, memo=None):
+        '''
+        Produces a tracked version of the value. Values that are not
+        dictionaries, lists or records (or that do not match the
+        expected_type) are produced unchanged. The memo maps the id of
+        each container already wrapped to its tracked version.
+        '''
+        if (isinstance(value, (_TrackedDict, _TrackedList, _TrackedRecord)) and
+                value._changes is self):
+            return value
+        if memo is None:
+            memo = {}
+        elif id(value) in memo:
+            return memo[id(value)]
+        if isinstance(expected_type, dict) and isinstance(value, dict):
+            fields, lookup = self.layout(expected_type)
+            lookup_type = lookup[1] if lookup else None
+            tracked = memo[id(value)] = _TrackedDict()
+            tracked._changes, tracked._type = self, expected_type
+            dict.update(tracked, [(k, self.wrap(v, fields.get(k, lookup_type), memo))
+                                  for k, v in value.items()])
+        elif isinstance(expected_type, list) and isinstance(value, list):
+            element_type = expected_type[0] if expected_type else None
+            tracked = memo[id(value)] = _TrackedList()
+            tracked._changes, tracked._type = self, expected_type
+            list.extend(tracked, [self.wrap(v, element_type, memo) for v in value])
+        elif (isinstance(expected_type, type) and issubclass(expected_type, Record) and
+                isinstance(value, expected_type)):
+            tracked = object.__new__(_tracked_record_class(expected_type._record))
+            memo[id(value)] = tracked
+            object.__setattr__(tracked, '_changes', self)
+            object.__setattr__(tracked, '_type', expected_type)
+            for key, attribute in expected_type._fields.items():
+                object.__setattr__(tracked, attribute,
+                                   self.wrap(getattr(value, attribute),
+                                             expected_type._schema[key], memo))
+        else:
+            return value
+        return tracked
+
+    def adopt(self, value, expected_type):
+        '''
+        Produces the value to store into the world, which is the value
+        itself. A container that is not tracked by this object is
+        remembered as untracked, so it is checked in full every time.
+        '''
+        if (isinstance(value, (dict, list, Record)) and
+                getattr(value, '_changes', None) is not self):
+            self.untracked[id(value)] = (_get_type_check(expected_type), value)
+        return value
+
+    def stored(self, container, key, value):
+        '''
+        Called when the value is stored into a tracked dictionary under the
+        given key. Produces the (tracked) value that should really be stored.
+        '''
+        self.version += 1
+        fields, lookup = self.layout(container._type)
+        if isinstance(key, str) and key in fields:
+            expected_type = fields[key]
+        elif lookup is not None and isinstance(key, lookup[0]):
+            expected_type = lookup[1]
+        else:
+            # A key that should not be there; the container will explain.
+            self.pending.append((_get_type_check(container._type), container))
+            return value
+        value = self.adopt(value, expected_type)
+        self.pending.append((_get_type_check(expected_type), value))
+        return value
+
+    def added(self, container, values):
+        '''
+        Called when the values are added to a tracked list. Produces the
+        (tracked) values that should really be added.
+        '''
+        self.version += 1
+        if not container._type:
+            self.pending.append((_get_type_check(container._type), container))
+            return values
+        element_type = container._type[0]
+        check = _get_type_check(element_type)
+        values = [self.adopt(value, element_type) for value in values]
+        self.pending.extend((check, value) for value in values)
+        return values
+
+    def removed(self, container):
+        '''
+        Called when keys are removed from a tracked dictionary; only Records
+        need to be looked at again, since they must keep all their keys.
+        '''
+        self.version += 1
+        fields, lookup = self.layout(container._type)
+        if fields:
+            self.pending.append((_get_type_check(container._type), container))
+
+    def moved(self, container):
+        '''
+        Called when the values of a tracked list are removed or reordered,
+        which cannot make the world the wrong type.
+        '''
+        self.version += 1
+
+    def check(self) -> bool:
+        '''
+        Checks all the values stored since the last check, and forgets them.
+
+        Also checks every untracked container still in use.
+
+        Returns:
+            bool: Whether all of those values had the right type.
+        '''
+        pending, self.pending = self.pending, []
+        for check, value in pending:
+            if not check(value):
+                return False
+        del pending
+        entries = list(self.untracked.values())
+        for (check, value), references in zip(entries, _reference_counts(entries)):
+            if references <= _UNUSED_REFERENCES:
+                del self.untracked[id(value)]
+            elif not check(value):
+                return False
+        return True
+
+    def sees_everything(self) -> bool:
+        '''
+        Whether every change to the world goes through a tracked container
+        (and so changes the version), which is not so while the world might
+        hold untracked containers.
+        '''
+        return not self.untracked
+
+
+class _TrackedDict(dict):
+    ''' A dictionary that reports changes to its WorldChanges. '''
+    __slots__ = ('_changes', '_type')
+
+    def __reduce_ex__(self, protocol):
+        return (dict, (dict(self),))
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, self._changes.stored(self, key, value))
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changes.removed(self)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        had_key = key in self
+        value = dict.pop(self, key, *default)
+        if had_key:
+            self._changes.removed(self)
+        return value
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self._changes.removed(self)
+        return item
+
+    def clear(self):
+        dict.clear(self)
+        self._changes.removed(self)
+
+
+class _TrackedList(list):
+    ''' A list that reports changes to its WorldChanges. '''
+    __slots__ = ('_changes', '_type')
+
+    def __reduce_ex__(self, protocol):
+        return (list, (list(self),))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = self._changes.added(self, list(value))
+        else:
+            value, = self._changes.added(self, [value])
+        list.__setitem__(self, index, value)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def append(self, value):
+        list.append(self, *self._changes.added(self, [value]))
+
+    def extend(self, values):
+        list.extend(self, self._changes.added(self, list(values)))
+
+    def insert(self, index, value):
+        list.insert(self, index, *self._changes.added(self, [value]))
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self._changes.moved(self)
+
+    def __imul__(self, times):
+        list.__imul__(self, times)
+        self._changes.moved(self)
+        return self
+
+    def pop(self, *index):
+        value = list.pop(self, *index)
+        self._changes.moved(self)
+        return value
+
+    def remove(self, value):
+        list.remove(self, value)
+        self._changes.moved(self)
+
+    def clear(self):
+        list.clear(self)
+        self._changes.moved(self)
+
+    def sort(self, *, key=None, reverse=False):
+        list.sort(self, key=key, reverse=reverse)
+        self._changes.moved(self)
+
+    def reverse(self):
+        list.reverse(self)
+        self._changes.moved(self)
+
+def assert_type(value, expected_type) -> bool:
+    """
+    Checks that the given value is of the expected_type.
+    
+    Args:
+        value (Any): Any kind of python value. Should have been computed by
+            the students' code (their actual answer).
+        expected_type (type): Any kind of type value. Should be in the format
+            used within CISC108. This includes support for literal composite
+            types (e.g., [int] and {str: int}) and record types.
+    Returns:
+        bool: Whether or not the assertion passed.
+    """
+    # Can we add in the line number and code?
+    line, code = get_line_code()
+    if None in (line, code):
+        context = ""
+    else:
+        context = MESSAGE_LINE_CODE.format(line=line, code=code)
+        #student_tests.lines.append(line)
+    
+    reason = make_type_validator(expected_type)(value, "value")
+    # TODO
+    #student_tests.tests += 1
+    if reason is not None:
+        #student_tests.failures += 1
+        if isinstance(expected_type, dict):
+            if isinstance(value, dict):
+                reason = "the "+reason
+            else:
+                reason = "the "+reason
+        print("FAILURE{context},".format(context=context), reason)
+        return False
+    elif not QUIET:
+        print(MESSAGE_GENERIC_SUCCESS.format(context=context))
+    #student_tests.successes += 1
+    return True
+
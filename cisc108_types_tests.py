@@ -0,0 +1,161 @@
+from cisc108 import assert_equal
+from cisc108_types import *
+from cisc108_types import MAX_INLINED_LOOPS, _get_type_check, _validate_type
+
+__VERSION__ = '0.0.1'
+
+Position = {'x': int, 'y': int}
+World = {'dots': [Position], 'score': int, 'names': {str: str}}
+
+def make_tracked_world():
+    changes = WorldChanges(World)
+    world = changes.wrap({'dots': [{'x': 1, 'y': 2}], 'score': 0, 'names': {}}, World)
+    return changes, world
+
+################################################################################
+## Testing WorldChanges.wrap
+# Aliases in the world are still aliases once it is tracked
+shared = {'x': 0, 'y': 0}
+changes = WorldChanges(World)
+world = changes.wrap({'dots': [shared, shared], 'score': 0, 'names': {}}, World)
+assert_equal(world['dots'][0] is world['dots'][1], True)
+world['dots'][0]['x'] = 5
+assert_equal(world['dots'][1]['x'], 5)
+# Wrapping a tracked world again gives back the same world
+assert_equal(changes.wrap(world, World) is world, True)
+
+################################################################################
+## Testing storing into a dictionary
+changes, world = make_tracked_world()
+version = changes.version
+world['score'] = 10
+assert_equal(changes.version, version + 1)
+assert_equal(changes.check(), True)
+world['score'] = 'ten'
+assert_equal(changes.check(), False)
+# Only the values stored since the last check are looked at
+assert_equal(changes.check(), True)
+changes, world = make_tracked_world()
+world['names']['ada'] = 'lovelace'
+assert_equal(changes.check(), True)
+world['names']['ada'] = 108
+assert_equal(changes.check(), False)
+
+################################################################################
+## Testing appending to a list
+# Appended dictionaries are kept, not copied
+changes, world = make_tracked_world()
+dot = {'x': 5, 'y': 6}
+world['dots'].append(dot)
+assert_equal(world['dots'][-1] is dot, True)
+dot['x'] = 99
+assert_equal(world['dots'][-1]['x'], 99)
+assert_equal(changes.check(), True)
+assert_equal(changes.sees_everything(), False)
+# Their changes are not tracked, so they are checked every time
+dot['x'] = 'far away'
+assert_equal(changes.check(), False)
+dot['x'] = 0
+world['dots'].extend([{'x': 1, 'y': 1}, {'x': 2, 'y': 2}])
+world['dots'].insert(0, {'x': 3, 'y': 3})
+assert_equal(len(world['dots']), 5)
+assert_equal(changes.check(), True)
+world['dots'].append({'x': 1})
+assert_equal(changes.check(), False)
+
+################################################################################
+## Testing removing from a list and a dictionary
+changes, world = make_tracked_world()
+dot = {'x': 5, 'y': 6}
+world['dots'].append(dot)
+assert_equal(changes.check(), True)
+version = changes.version
+world['dots'].remove(dot)
+assert_equal(changes.version, version + 1)
+world['dots'].pop()
+assert_equal(world['dots'], [])
+# Once nothing else refers to an untracked dictionary, it is forgotten
+del dot
+assert_equal(changes.check(), True)
+assert_equal(changes.sees_everything(), True)
+world['names']['ada'] = 'lovelace'
+del world['names']['ada']
+assert_equal(world['names'], {})
+assert_equal(changes.check(), True)
+
+################################################################################
+## Testing make_record_class
+Bag = make_record_class('Bag', {'items': [int], 'get': int, 'red dots': int})
+bag = Bag([1, 2], 3, 4)
+# Keys that records already use as names get an underscore at the end
+assert_equal(bag.items_, [1, 2])
+assert_equal(bag.get_, 3)
+assert_equal(bag.red_dots, 4)
+assert_equal(bag.get('items'), [1, 2])
+assert_equal(bag == {'items': [1, 2], 'get': 3, 'red dots': 4}, True)
+assert_equal(repr(bag), "Bag({'items': [1, 2], 'get': 3, 'red dots': 4})")
+assert_equal(dict(bag.items()), {'items': [1, 2], 'get': 3, 'red dots': 4})
+# Tracked records can still tell their fields from their tracking
+Tracked = make_record_class('Tracked', {'_changes': int, '_type': str})
+changes = WorldChanges([Tracked])
+tracked = changes.wrap([Tracked(1, 'a')], [Tracked])
+tracked[0]['_changes'] = 2
+assert_equal(tracked[0]['_changes'], 2)
+assert_equal(changes.check(), True)
+tracked[0]['_type'] = 5
+assert_equal(changes.check(), False)
+
+################################################################################
+## Testing make_type_validator
+def agrees(value, expected_type) -> bool:
+    ''' Whether the compiled check and _validate_type judge the value the same. '''
+    reason = _validate_type(value, expected_type)
+    return (_get_type_check(expected_type)(value) == (reason is None) and
+            make_type_validator(expected_type)(value) == reason)
+
+def nest(expected_type, value, depth):
+    ''' Wraps the type and the value in lists and Lookups, depth times. '''
+    for level in range(depth):
+        if level % 2:
+            expected_type, value = {str: expected_type}, {'level': value}
+        else:
+            expected_type, value = [expected_type], [value, value]
+    return expected_type, value
+
+Point = make_record_class('Point', {'x': float, 'y': float})
+CASES = [
+    # Leaves, with float accepting int, and None accepted by every leaf
+    (int, [1, True, None, 1.5, '1']),
+    (float, [1.5, 1, None, '1.5', [1.5]]),
+    (str, ['', None, b'', 1]),
+    # Empty lists only accept empty lists
+    ([], [[], [1], None, {}]),
+    ([int], [[], [1, 2], [1, 'two'], [None], (1, 2), None]),
+    # Fields mixed with a Lookup
+    ({'name': str, str: str}, [{'name': 'a'}, {'name': 'a', 'b': 'c'},
+                               {'b': 'c'}, {'name': 'a', 'b': 1}, {'name': 'a', 1: 'c'}]),
+    ({'name': str, 'size': int}, [{'name': 'a', 'size': 1}, {'name': 'a'},
+                                  {'name': 'a', 'size': 1, 'extra': 2}, []]),
+    ({int: [float]}, [{}, {1: [1, 2.5]}, {1: [1], 'two': []}, {1: ['a']}]),
+    # Record classes, which only accept records of their own class
+    (Point, [Point(1, 2.5), Point('one', 2), {'x': 1, 'y': 2}, None]),
+    ({'points': [Point]}, [{'points': [Point(1, 2)]}, {'points': [Point(1, None)]},
+                           {'points': [Point([], 2)]}]),
+]
+for expected_type, values in CASES:
+    for value in values:
+        assert_equal(agrees(value, expected_type), True)
+assert_equal(make_type_validator(float)(1), None)
+assert_equal(make_type_validator([])([]), None)
+assert_equal(make_type_validator({'name': str, str: str})({'name': 'a', 'b': 1}) is None, False)
+# Types nested deeper than the loops that are inlined into one function
+for depth in [MAX_INLINED_LOOPS - 1, MAX_INLINED_LOOPS, MAX_INLINED_LOOPS + 1, 3 * MAX_INLINED_LOOPS]:
+    expected_type, value = nest(int, 5, depth)
+    assert_equal(agrees(value, expected_type), True)
+    assert_equal(make_type_validator(expected_type)(value), None)
+    expected_type, value = nest(int, 'five', depth)
+    assert_equal(agrees(value, expected_type), True)
+    assert_equal(make_type_validator(expected_type)(value) is None, False)
+# Equal types share one compiled check
+assert_equal(_get_type_check({'dots': [Point]}) is _get_type_check({'dots': [Point]}), True)
+assert_equal(_get_type_check({'dots': [Point]}) is _get_type_check({'dots': [int]}), False)
@@ -0,0 +1,200 @@
+"""
+This file contains the Arcade Window that shows a CISC108 game, and the
+other tools that need arcade. cisc108_game.py only imports it once a window
+is actually made.
+
+You do not need to open or read this file. It must
+be in the same folder as your other files.
+
+Change Log:
+  - 0.0.4: Saved frames reuse one framebuffer, instead of a new texture each
+  - 0.0.3: Tells the game when each frame is finished
+  - 0.0.2: Batched sprites use the real texture behind a LazyTexture
+  - 0.0.1: Moved out of cisc108_game.py (version 0.0.16)
+"""
+
+__version__ = '0.0.4'
+
+import arcade
+import inspect
+
+from cisc108_game import GAME_SPEED, resolve_texture
+
+class Cisc108Window(arcade.Window):
+    """
+    An Arcade Window that shows a Cisc108GameUntyped, passing along all of
+    its events to the game.
+    
+    Args:
+        game (Cisc108GameUntyped): The game to show.
+        window_width (int): The width of the game window.
+        window_height (int): The height of the game window.
+        window_caption (str): The title of the game window.
+        update_rate (float): The seconds between frames.
+    """
+    def __init__(self, game, window_width, window_height, window_caption,
+                 update_rate=GAME_SPEED):
+        super().__init__(window_width, window_height, window_caption, update_rate=update_rate)
+        self.game = game
+        self.saved_frame = None
+    
+    def on_draw(self):
+        arcade.start_render()
+        self.game.on_draw()
+        self.game.frame_finished()
+    
+    def on_update(self, delta_time: float):
+        self.game.on_update(delta_time)
+    
+    def on_key_press(self, key: int, modifiers: int):
+        self.game.on_key_press(key, modifiers)
+    
+    def on_key_release(self, key: int, modifiers: int):
+        self.game.on_key_release(key, modifiers)
+    
+    def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
+        self.game.on_mouse_press(x, y, button, modifiers)
+    
+    def on_mouse_motion(self, x: int, y: int, dx: int, dy: int):
+        self.game.on_mouse_motion(x, y, dx, dy)
+    
+    def on_close(self):
+        self.game.on_close()
+        super().on_close()
+    
+    def save_frame(self):
+        """
+        Copies what has been drawn so far into a framebuffer, and produces
+        it. The same framebuffer is used every time (unless the window
+        changes size), so saving frames does not use up any more memory.
+        """
+        size = self.get_framebuffer_size()
+        if self.saved_frame is None or self.saved_frame.size != size:
+            texture = self.ctx.texture(size, components=4)
+            self.saved_frame = self.ctx.framebuffer(color_attachments=[texture])
+        self.ctx.copy_framebuffer(self.ctx.screen, self.saved_frame)
+        return self.saved_frame
+    
+    def show_frame(self, frame):
+        """ Copies a saved frame onto the entire window. """
+        self.ctx.copy_framebuffer(frame, self.ctx.screen)
+
+class DrawBatcher:
+    """
+    While started, replaces arcade's immediate drawing functions with ones
+    that take the same arguments but only record the call. Runs of similar
+    calls are then drawn together when finished: textured rectangles as one
+    SpriteList, and plain rectangles as one ShapeElementList. Any other
+    arcade drawing function first draws what was recorded, so everything is
+    still drawn in the same order.
+    
+    Each run remembers what it drew last frame, so a run that is the same
+    as before is drawn again without being rebuilt.
+    
+    Attributes:
+        runs (list): The [kind, calls] runs recorded this frame.
+        drawn (list): The [kind, calls, batch] runs drawn last frame.
+    """
+    TEXTURED = ('draw_texture_rectangle', 'draw_xywh_rectangle_textured')
+    SHAPES = ('draw_rectangle_filled', 'draw_xywh_rectangle_filled',
+              'draw_rectangle_outline', 'draw_xywh_rectangle_outline')
+    
+    def __init__(self):
+        self.runs = []
+        self.drawn = []
+        self.originals = {}
+        self.batches_drawn = 0
+    
+    def start(self):
+        """ Starts recording calls to arcade's drawing functions. """
+        self.runs = []
+        self.batches_drawn = 0
+        for name in dir(arcade):
+            function = getattr(arcade, name)
+            if not name.startswith('draw_') or not inspect.isfunction(function):
+                continue
+            self.originals[name] = function
+            if name in self.TEXTURED:
+                setattr(arcade, name, self.recorder('sprites', name))
+            elif name in self.SHAPES:
+                setattr(arcade, name, self.recorder('shapes', name))
+            else:
+                setattr(arcade, name, self.drawing_first(function))
+    
+    def finish(self):
+        """ Stops recording, and draws everything still recorded. """
+        for name, function in self.originals.items():
+            setattr(arcade, name, function)
+        self.originals = {}
+        self.flush()
+        del self.drawn[self.batches_drawn:]
+    
+    def recorder(self, kind, name):
+        def record(*args, **kwargs):
+            call = (name, args, tuple(kwargs.items()))
+            if self.runs and self.runs[-1][0] == kind:
+                self.runs[-1][1].append(call)
+            else:
+                self.runs.append([kind, [call]])
+        return record
+    
+    def drawing_first(self, function):
+        def draw(*args, **kwargs):
+            self.flush()
+            return function(*args, **kwargs)
+        return draw
+    
+    def flush(self):
+        """ Draws the runs recorded so far, each as a single batch. """
+        runs, self.runs = self.runs, []
+        for kind, calls in runs:
+            index = self.batches_drawn
+            self.batches_drawn += 1
+            if index < len(self.drawn) and self.drawn[index][:2] == [kind, calls]:
+                self.drawn[index][2].draw()
+                continue
+            if kind == 'sprites':
+                old = self.drawn[index][2] if index < len(self.drawn) and self.drawn[index][0] == kind else None
+                batch = self.make_sprites(calls, old)
+            else:
+                batch = self.make_shapes(calls)
+            batch.draw()
+            if index < len(self.drawn):
+                self.drawn[index] = [kind, calls, batch]
+            else:
+                self.drawn.append([kind, calls, batch])
+    
+    def make_sprites(self, calls, sprites=None):
+        """ Turns textured rectangle calls into a SpriteList, reusing sprites. """
+        if sprites is None:
+            sprites = arcade.SpriteList()
+        while len(sprites) > len(calls):
+            sprites.pop()
+        while len(sprites) < len(calls):
+            sprites.append(arcade.Sprite())
+        for sprite, (name, args, kwargs) in zip(sprites, calls):
+            x, y, width, height, texture, *rest = args
+            options = dict(zip(('angle', 'alpha'), rest), **dict(kwargs))
+            if name == 'draw_xywh_rectangle_textured':
+                x, y = x + width/2, y + height/2
+            sprite.texture = resolve_texture(texture)
+            sprite.center_x, sprite.center_y = x, y
+            sprite.width, sprite.height = width, height
+            sprite.angle = options.get('angle', 0)
+            sprite.alpha = options.get('alpha', 255)
+        return sprites
+    
+    def make_shapes(self, calls):
+        """ Turns rectangle calls into a ShapeElementList. """
+        shapes = arcade.ShapeElementList()
+        for name, args, kwargs in calls:
+            x, y, width, height, color, *rest = args
+            if name.startswith('draw_xywh'):
+                x, y = x + width/2, y + height/2
+            if name.endswith('outline'):
+                options = dict(zip(('border_width', 'tilt_angle'), rest), **dict(kwargs))
+                shapes.append(arcade.create_rectangle_outline(x, y, width, height, color, **options))
+            else:
+                options = dict(zip(('tilt_angle',), rest), **dict(kwargs))
+                shapes.append(arcade.create_rectangle_filled(x, y, width, height, color, **options))
+        return shapes
@@ -1,5 +1,5 @@
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 # Game Constants
 WINDOW_WIDTH = 500
@@ -11,7 +11,7 @@ GAME_SPEED = 1/60
 TIMER_MAXIMUM = 100
 
 # Load images
-CISC108_LOGO = arcade.load_texture("cisc108_banner.png")
+CISC108_LOGO = assets.load_texture("cisc108_banner.png")
 
 # Define your general world
 World = {
@@ -124,7 +124,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == "__main__":
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
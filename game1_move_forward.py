@@ -11,7 +11,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 # Game Constants
 WINDOW_WIDTH = 500
@@ -22,7 +22,7 @@ GAME_TITLE = "Moving Forward!"
 MOVE_SPEED = 4
 
 # Load images
-DOG_IMAGE = arcade.load_texture("doggo.png")
+DOG_IMAGE = assets.load_texture("doggo.png")
 
 # Define your general world
 World = {
@@ -33,8 +33,8 @@ World = {
 
 # Define the initial world
 INITIAL_WORLD = {
-    'x': WINDOW_WIDTH/4,
-    'y': WINDOW_HEIGHT/2,
+    'x': WINDOW_WIDTH//4,
+    'y': WINDOW_HEIGHT//2,
     'moving?': True
 }
 
@@ -98,7 +98,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == "__main__":
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
@@ -14,7 +14,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 # Game Constants
 WINDOW_WIDTH = 500
@@ -39,8 +39,8 @@ INITIAL_WORLD = {
 }
 
 # Load images
-ADA = arcade.load_texture('ada.png')
-POTATO = arcade.load_texture('potato.png')
+ADA = assets.load_texture('ada.png')
+POTATO = assets.load_texture('potato.png')
 
 def draw_image_centered(image: arcade.Texture):
     """
@@ -129,7 +129,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == "__main__":
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
@@ -16,7 +16,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 # Game Constants
 WINDOW_WIDTH = 500
@@ -28,7 +28,7 @@ RED_DOT_SIZE = 20
 DOT_SPEED = 1
 
 # Create a red circle image to represent our laser pointer
-LASER_POINTER = arcade.make_circle_texture(RED_DOT_SIZE, arcade.color.RED)
+LASER_POINTER = assets.make_circle_texture(RED_DOT_SIZE, arcade.color.RED)
 
 ################################################################################
 ## Record definitions
@@ -149,11 +149,18 @@ World = {
 }
 
 # Define the initial world
-INITIAL_WORLD = {
-    # Start off with one red dot
-    'red dots': [make_red_dot()],
-    'score': 0
-}
+def make_initial_world() -> World:
+    '''
+    Makes the initial world, which starts with one randomly placed red dot.
+    
+    Returns:
+        World: A new initial world.
+    '''
+    return {
+        # Start off with one red dot
+        'red dots': [make_red_dot()],
+        'score': 0
+    }
 
 ################################################################################
 # Drawing functions
@@ -258,7 +265,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, make_initial_world,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
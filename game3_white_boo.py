@@ -16,7 +16,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 # Game Constants
 WINDOW_WIDTH = 800
@@ -29,7 +29,7 @@ BOO_SPEED = 10
 
 # Create a white boo image to represent our laser pointer
 # Load images
-LASER_POINTER = arcade.load_texture("white_boo.png")
+LASER_POINTER = assets.load_texture("white_boo.png")
 
 ################################################################################
 ## Record definitions
@@ -152,11 +152,18 @@ World = {
 }
 
 # Define the initial world
-INITIAL_WORLD = {
-    # Start off with one white boo
-    'white boos': [make_white_boo()],
-    'score': 0
-}
+def make_initial_world() -> World:
+    '''
+    Makes the initial world, which starts with one white boo.
+    
+    Returns:
+        World: A new initial world.
+    '''
+    return {
+        # Start off with one white boo
+        'white boos': [make_white_boo()],
+        'score': 0
+    }
 
 ################################################################################
 # Drawing functions
@@ -264,7 +271,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, make_initial_world,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
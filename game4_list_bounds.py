@@ -129,12 +129,20 @@ World = {
 
 
 ## Define the initial world
-INITIAL_WORLD = {
-    'values': random_list(),
-    'target': 0,
-    'score': 0,
-    'hovering': None
-}
+def make_initial_world() -> World:
+    '''
+    Makes the initial world, with a new random list of values. Each call
+    gives a different list, so tests can make as many worlds as they need.
+    
+    Returns:
+        World: A new initial world.
+    '''
+    return {
+        'values': random_list(),
+        'target': 0,
+        'score': 0,
+        'hovering': None
+    }
 
 ################################################################################
 # Drawing functions
@@ -285,7 +293,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, make_initial_world,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
@@ -4,13 +4,7 @@ from game4_list_bounds import *
 __VERSION__ = '0.0.1'
 
 # Need to be able to quickly make test worlds.
-def make_test_world() -> World:
-    return {
-        'values': random_list(),
-        'target': 0,
-        'score': 0,
-        'hovering': None
-    }
+make_test_world = make_initial_world
 
 ################################################################################
 ## Testing random_value
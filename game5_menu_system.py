@@ -11,7 +11,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, LazyTexture, assets
 
 # Game Constants
 WINDOW_WIDTH = 725
@@ -22,14 +22,14 @@ GAME_TITLE = "Navigate the menus!"
 ################################################################################
 ## Record definitions
 
-CAMPUS_IMAGE = arcade.load_texture('campus.png')
-SMITH_IMAGE = arcade.load_texture('smith.png')
-TRABANT_IMAGE = arcade.load_texture('trabant.png')
-EAST_CAMPUS_IMAGE = arcade.load_texture('east_campus.png')
-SECRET_IMAGE = arcade.load_texture('secret.png')
-PERKINS_IMAGE = arcade.load_texture('perkins.png')
+CAMPUS_IMAGE = assets.load_texture('campus.png')
+SMITH_IMAGE = assets.load_texture('smith.png')
+TRABANT_IMAGE = assets.load_texture('trabant.png')
+EAST_CAMPUS_IMAGE = assets.load_texture('east_campus.png')
+SECRET_IMAGE = assets.load_texture('secret.png')
+PERKINS_IMAGE = assets.load_texture('perkins.png')
 
-Menu = {'name': str, 'text': str, 'picture': str}
+Menu = {'name': str, 'text': str, 'picture': LazyTexture}
 
 START_MENU = {'name': "University of Delaware Tour", 'text': "Let's explore campus.\nPress 'n' to advance.",
               'picture': CAMPUS_IMAGE}
@@ -143,7 +143,7 @@ def handle_motion(world: World, x: int, y: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
                 draw_world, update_world, handle_key, handle_mouse, handle_motion)
     arcade.set_background_color(BACKGROUND_COLOR)
     arcade.run()
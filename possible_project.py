@@ -12,7 +12,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 ################################################################################
 ## Game Constants
@@ -29,14 +29,14 @@ GRID_HEIGHT = 25
 CIRCLE_SIZE = 20
 
 # Make three circle images: red, blue, and green.
-WHITE_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.WHITE)
-RED_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.RED)
-BLUE_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.BLUE)
-GREEN_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.GREEN)
-YELLOW_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.YELLOW)
-PURPLE_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.PURPLE)
-PINK_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.PINK)
-BLACK_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.BLACK)
+WHITE_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.WHITE)
+RED_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.RED)
+BLUE_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.BLUE)
+GREEN_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.GREEN)
+YELLOW_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.YELLOW)
+PURPLE_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.PURPLE)
+PINK_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.PINK)
+BLACK_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.BLACK)
 
 # We can map the string versions of colors to the texture with a dictionary
 CIRCLE_COLOR_TEXTURES = {
@@ -107,12 +107,20 @@ World = {
     'color': str
 }
 
-INITIAL_WORLD = {
-    'grid': make_grid_color(GRID_WIDTH, GRID_HEIGHT, 'white'),
-    'current mouse x': None,
-    'current mouse y': None,
-    'color': 'white'
-}
+def make_initial_world() -> World:
+    """
+    Makes the initial world: a white grid (under the palette of colors
+    along its first row), with white selected.
+    
+    Returns:
+        World: A new initial world.
+    """
+    return {
+        'grid': make_grid_color(GRID_WIDTH, GRID_HEIGHT, 'white'),
+        'current mouse x': None,
+        'current mouse y': None,
+        'color': 'white'
+    }
 
 ################################################################################
 # Drawing functions
@@ -315,7 +323,7 @@ def handle_release(world: World, key: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, make_initial_world,
                 draw_world, update_world, handle_key, handle_mouse,
                 handle_motion, handle_release)
     arcade.set_background_color(BACKGROUND_COLOR)
@@ -11,7 +11,7 @@ Change log:
 __VERSION__ = '0.0.1'
 
 import arcade, math, random
-from cisc108_game import Cisc108Game
+from cisc108_game import Cisc108Game, assets
 
 ################################################################################
 ## Game Constants
@@ -28,9 +28,9 @@ GRID_HEIGHT = 25
 CIRCLE_SIZE = 20
 
 # Make three circle images: red, blue, and green.
-RED_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.RED)
-BLUE_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.BLUE)
-GREEN_CIRCLE = arcade.make_circle_texture(CIRCLE_SIZE, arcade.color.GREEN)
+RED_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.RED)
+BLUE_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.BLUE)
+GREEN_CIRCLE = assets.make_circle_texture(CIRCLE_SIZE, arcade.color.GREEN)
 
 # We can map the string versions of colors to the texture with a dictionary
 CIRCLE_COLOR_TEXTURES = {
@@ -76,11 +76,19 @@ World = {
     'current mouse y': int
 }
 
-INITIAL_WORLD = {
-    'grid': make_grid_color(GRID_WIDTH, GRID_HEIGHT, 'red'),
-    'current mouse x': None,
-    'current mouse y': None
-}
+def make_initial_world() -> World:
+    """
+    Makes the initial world: a grid that is entirely red, with the mouse
+    not yet inside it.
+    
+    Returns:
+        World: A new initial world.
+    """
+    return {
+        'grid': make_grid_color(GRID_WIDTH, GRID_HEIGHT, 'red'),
+        'current mouse x': None,
+        'current mouse y': None
+    }
 
 
 ################################################################################
@@ -259,7 +267,7 @@ def handle_release(world: World, key: int):
 # Don't need to change any of this
 
 if __name__ == '__main__':
-    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, INITIAL_WORLD,
+    Cisc108Game(World, WINDOW_WIDTH, WINDOW_HEIGHT, GAME_TITLE, make_initial_world,
                 draw_world, update_world, handle_key, handle_mouse,
                 handle_motion, handle_release)
     arcade.set_background_color(BACKGROUND_COLOR)